@@ -1,10 +1,11 @@
 import os
-import pandas as pd
 import json
 from datetime import datetime
+from canpar.profiling import parse_entry_point_args, profiled
+from canpar.results import find_results, read_results
 
 # --- Configuration ---
-INPUT_FILE = "Canpar_Shipment_Summary.xlsx"
+INPUT_STEM = "Canpar_Shipment_Summary"  # .parquet / .csv written by 0. BB_to_Canpar.py (.xlsx still accepted)
 OUTPUT_FILE = "Bestbuy_Import.csv"
 ALL_SHIPMENTS_XLSX = "All_Bestbuy_Imports.xlsx"
 ALL_SHIPMENTS_JSON = "All_Bestbuy_Imports.json"
@@ -18,9 +19,12 @@ def main():
     Main function to process the Canpar shipment summary and generate
     the Best Buy import file.
     """
+    import pandas as pd
+
     # 1. Check if input file exists
-    if not os.path.exists(INPUT_FILE):
-        print(f"Error: The input file '{INPUT_FILE}' was not found.")
+    input_file = find_results(INPUT_STEM)
+    if not input_file:
+        print(f"Error: No shipment summary ('{INPUT_STEM}.parquet/.csv/.xlsx') was found.")
         return
 
     # 2. Delete previous Bestbuy_Import.csv if it exists
@@ -28,11 +32,11 @@ def main():
         os.remove(OUTPUT_FILE)
         print(f"Removed existing output file: {OUTPUT_FILE}")
 
-    # 3. Load the Canpar_Shipment_Summary.xlsx and validate
+    # 3. Load the shipment summary and validate
     try:
-        df = pd.read_excel(INPUT_FILE)
+        df = read_results(input_file)
     except Exception as e:
-        print(f"Error reading Excel file '{INPUT_FILE}': {e}")
+        print(f"Error reading summary file '{input_file}': {e}")
         return
 
     # Validate required columns
@@ -119,4 +123,6 @@ def main():
     print(f"Successfully created Bestbuy import file: {OUTPUT_FILE}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_entry_point_args("Build the Best Buy tracking import from the Canpar shipment summary.")
+    with profiled("canpar_to_bb", args.profile):
+        main()
\ No newline at end of file
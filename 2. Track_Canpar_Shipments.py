@@ -0,0 +1,75 @@
+import time
+import argparse
+from datetime import datetime
+from canpar.config import get_config, ConfigError
+from canpar.profiling import add_profile_argument, profiled
+from canpar.tracking import (
+    TrackingStore, get_tracking_db_path, refresh, shipments_from_log, shipments_from_summary, SHIPMENT_LOG_FILE,
+)
+
+# --- Configuration ---
+SUMMARY_STEM = "Canpar_Shipment_Summary"  # written by 0. BB_to_Canpar.py
+MAX_WATCH_SLEEP_S = 15 * 60  # wake up at least this often in --watch mode to pick up new shipments
+
+# ----------------------------------------------------------------------
+
+def sync_shipments(store, log_file, summary_stem):
+    """Adds any newly shipped barcodes from the shipment log and the CSV-path summary."""
+    shipments = shipments_from_log(log_file) + shipments_from_summary(summary_stem)
+    added = store.add_shipments(shipments, datetime.now())
+    if added:
+        print(f"Tracking {added} new shipment(s).")
+
+def run_once(store, args):
+    sync_shipments(store, args.log, args.summary)
+    stats = refresh(store, limit=args.limit)
+    counts = store.counts()
+    print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] Checked {stats['checked']} shipment(s): {stats['new_events']} new scan(s), "
+          f"{stats['delivered']} delivered, {stats['expired']} expired, {stats['errors']} error(s). "
+          f"Open: {counts.get('open', 0)}, delivered: {counts.get('delivered', 0)}, expired: {counts.get('expired', 0)}.")
+
+def print_status(store, key):
+    rows = store.connection.execute("SELECT * FROM shipments WHERE barcode = ? OR order_id = ?", (key, key)).fetchall()
+    if not rows:
+        print(f"No tracked shipment for '{key}'.")
+    for row in rows:
+        print(f"{row['order_id']}  {row['barcode']}  {row['state']}  last: {row['last_description'] or '-'} "
+              f"({row['last_event_at'] or 'no scans yet'}), next check: {row['next_check_at'] or 'never'}")
+        for event in store.history(row['barcode']):
+            print(f"    {event['event_at']}  {event['code']:<4} {event['description']}  {event['location']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh Canpar delivery status for every open shipment.")
+    parser.add_argument("--watch", action="store_true", help="keep running, polling shipments as they come due")
+    parser.add_argument("--limit", type=int, help="check at most this many shipments per refresh")
+    parser.add_argument("--log", default=SHIPMENT_LOG_FILE, help="canpar_shipments_log.json to pick up shipments from")
+    parser.add_argument("--summary", default=SUMMARY_STEM, help="shipment summary stem to pick up shipments from")
+    parser.add_argument("--status", metavar="BARCODE_OR_ORDER", help="print the stored scan history and exit")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    try:
+        get_config()
+    except ConfigError as e:
+        print(f"FATAL: {e}")
+        return
+
+    store = TrackingStore(get_tracking_db_path())
+    try:
+        if args.status:
+            print_status(store, args.status)
+            return
+        with profiled("track_shipments", args.profile):
+            run_once(store, args)
+            while args.watch:
+                next_due = store.next_due_at()
+                sleep_s = MAX_WATCH_SLEEP_S if next_due is None else (next_due - datetime.now()).total_seconds()
+                time.sleep(min(MAX_WATCH_SLEEP_S, max(1.0, sleep_s)))
+                run_once(store, args)
+    except KeyboardInterrupt:
+        print("Stopped.")
+    finally:
+        store.close()
+
+if __name__ == "__main__":
+    main()
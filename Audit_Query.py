@@ -0,0 +1,69 @@
+import os
+import json
+import argparse
+from canpar.audit import AuditIndex, resolve_audit_dir, INDEX_FILE
+from canpar.config import ConfigError
+from canpar.profiling import add_profile_argument, profiled
+
+# Answers "what happened to order X" from the audit trail (audit/*.jsonl),
+# through an index that is brought up to date on every query.
+COLUMNS = [("ts", 23), ("order_id", 14), ("stage", 12), ("status", 18), ("duration_ms", 10), ("sku", 24),
+           ("account", 10), ("tracking_number", 16)]
+DETAIL_KEYS = ("error", "shipment_id", "label_path", "failed_path", "xml_path", "summary_path", "log_path", "last_scan")
+
+def print_events(events):
+    print("  ".join(name.ljust(width) for name, width in COLUMNS))
+    for event in events:
+        print("  ".join(str(event.get(name, "")).ljust(width) for name, width in COLUMNS))
+        for key in DETAIL_KEYS:
+            if key in event:
+                print(f"    {key}: {event[key]}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the per-order audit trail.")
+    parser.add_argument("--order", help="order number")
+    parser.add_argument("--date", help="single day, YYYY-MM-DD")
+    parser.add_argument("--since", help="first day, YYYY-MM-DD")
+    parser.add_argument("--until", help="last day, YYYY-MM-DD")
+    parser.add_argument("--status", help="e.g. FAILED, SHIPPED, SOAP_FAULT, DELIVERED")
+    parser.add_argument("--sku", help="offer SKU")
+    parser.add_argument("--stage", help="order, shipment, label, label_retry or tracking")
+    parser.add_argument("--account", help="shipper account name")
+    parser.add_argument("--tracking", help="tracking number")
+    parser.add_argument("--limit", type=int, help="only the most recent N events")
+    parser.add_argument("--json", action="store_true", help="print the raw JSON events")
+    parser.add_argument("--rebuild-index", action="store_true", help="re-index every audit file from scratch")
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    try:
+        audit_dir = resolve_audit_dir()
+    except ConfigError as e:
+        print(f"FATAL: {e}")
+        return
+    if not os.path.isdir(audit_dir):
+        print(f"No audit trail found at {audit_dir}.")
+        return
+    if args.rebuild_index and os.path.exists(os.path.join(audit_dir, INDEX_FILE)):
+        os.remove(os.path.join(audit_dir, INDEX_FILE))
+
+    index = AuditIndex(audit_dir)
+    try:
+        with profiled("audit_query", args.profile):
+            index.sync()
+            events = index.query(order_id=args.order, since=args.date or args.since, until=args.date or args.until,
+                                 status=args.status, sku=args.sku, stage=args.stage, account=args.account,
+                                 tracking_number=args.tracking, limit=args.limit)
+    finally:
+        index.close()
+
+    if args.json:
+        for event in events:
+            print(json.dumps(event, ensure_ascii=False))
+        return
+    if events:
+        print_events(events)
+    print(f"{len(events)} event(s).")
+
+if __name__ == "__main__":
+    main()
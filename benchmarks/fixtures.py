@@ -0,0 +1,82 @@
+"""
+Synthetic, reproducible inputs for the benchmarks.
+
+Orders are cloned from the rows of the repo's orders.csv (so every column the
+scripts read is present and realistic) with new order numbers, and the same
+orders are also written as a Best Buy API style orders_pending_shipping.json.
+
+    python benchmarks/fixtures.py --orders 500 --output-dir /tmp/bench
+"""
+import os
+import csv
+import json
+import random
+import argparse
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATE_CSV = os.path.join(REPO_ROOT, "orders.csv")
+DEFAULT_SEED = 1234
+
+def read_template_rows(path=TEMPLATE_CSV):
+    with open(path, "r", newline="", encoding="utf-8-sig") as f:
+        reader = csv.DictReader(f)
+        return reader.fieldnames, list(reader)
+
+def synthetic_rows(count, seed=DEFAULT_SEED):
+    """Returns (fieldnames, rows) with `count` orders cloned from the template export."""
+    fieldnames, templates = read_template_rows()
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        row = dict(rng.choice(templates))
+        row["Order number"] = f"9{i:08d}-A"
+        row["Quantity"] = str(rng.choice([1, 1, 1, 2, 3]))
+        rows.append(row)
+    return fieldnames, rows
+
+def to_api_order(row):
+    """Converts an export row to the order shape returned by the Best Buy orders API."""
+    return {
+        "order_id": row["Order number"],
+        "total_price": float(row["Total order amount incl. VAT (including shipping charges)"] or 0),
+        "shipping_deadline": row.get("Shipping deadline", ""),
+        "customer": {
+            "firstname": row["Shipping address first name"],
+            "lastname": row["Shipping address last name"],
+            "shipping_address": {
+                "street_1": row["Shipping address street 1"], "city": row["Shipping address city"],
+                "state": row["Shipping address state"], "zip_code": row["Shipping address zip"],
+                "country_iso_code": "CA", "phone": row["Shipping address phone"],
+            },
+        },
+        "order_lines": [{
+            "offer_sku": row["Offer SKU"], "product_sku": row["Product SKU"], "quantity": int(row["Quantity"]),
+        }],
+    }
+
+def write_orders_csv(path, count, seed=DEFAULT_SEED):
+    fieldnames, rows = synthetic_rows(count, seed)
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+    return path
+
+def write_pending_json(path, count, seed=DEFAULT_SEED):
+    _, rows = synthetic_rows(count, seed)
+    with open(path, "w") as f:
+        json.dump([to_api_order(row) for row in rows], f, indent=4)
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic orders.csv and orders_pending_shipping.json fixtures.")
+    parser.add_argument("--orders", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--output-dir", default=".")
+    args = parser.parse_args()
+    os.makedirs(args.output_dir, exist_ok=True)
+    print(write_orders_csv(os.path.join(args.output_dir, "orders.csv"), args.orders, args.seed))
+    print(write_pending_json(os.path.join(args.output_dir, "orders_pending_shipping.json"), args.orders, args.seed))
+
+if __name__ == "__main__":
+    main()
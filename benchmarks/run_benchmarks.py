@@ -0,0 +1,254 @@
+"""
+Reproducible benchmark suite for the shipping path.
+
+Runs every stage against the local SOAP stub (soap_stub.py) and synthetic
+fixtures (fixtures.py), timing each one separately:
+
+    cli_startup             `<entry point> --help` in a fresh interpreter, per script
+    client_setup            create_client(): first one parses the WSDL, later ones reuse it
+    csv_ingest              load_orders() on the synthetic orders.csv
+    request_build           build_shipment_request() per order
+    request_serialize       zeep envelope serialization per order
+    soap_process_shipment   processShipment round trip per order
+    soap_get_labels         getLabels round trip per order
+    label_decode_write      write_label_pdf() per label
+    log_update              update_log_file() per order (shipment log)
+    summary_export          results sink ([summary] format) for the whole batch
+    summary_readback        read_results() of that file, as 1. Canpar_to_BB.py does
+    process_orders_e2e      canpar.csv_orders.process_orders(), whole batch
+    run_shipping_process_e2e  canpar.api_orders.run_shipping_process(), whole batch
+
+Results are written as JSON (one file per commit by default) so runs can be
+compared with --compare.
+
+    python benchmarks/run_benchmarks.py --orders 200 --latency-ms 50 --workers 4
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/<old>.json
+"""
+import os
+import sys
+import io
+import json
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from contextlib import redirect_stdout
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+import fixtures
+from soap_stub import start_stub
+
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+ENTRY_POINTS = [
+    os.path.join(REPO_ROOT, "0. BB_to_Canpar.py"),
+    os.path.join(REPO_ROOT, "1. Canpar_to_BB.py"),
+    os.path.join(REPO_ROOT, "jules_bb_python", "shipping", "monolithic_process_shipments.py"),
+    os.path.join(REPO_ROOT, "jules_bb_python", "shipping", "retry_failed_labels.py"),
+]
+REGRESSION_THRESHOLD = 0.10  # flag stages that got more than 10% slower
+
+def git_revision():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_ROOT,
+                                    capture_output=True, text=True).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+
+# ==============================================================================
+# --- STAGES ---
+# ==============================================================================
+def bench_startup(args, timings):
+    """Times how long each entry point takes to print --help, i.e. its import-time cost."""
+    for _ in range(args.repeat):
+        for script in ENTRY_POINTS:
+            with timings.stage("cli_startup"):
+                subprocess.run([sys.executable, script, "--help"], cwd=REPO_ROOT, stdout=subprocess.DEVNULL, check=True)
+
+def bench_components(workdir, args, timings):
+    """Times each stage of the CSV path in isolation, order by order."""
+    from lxml import etree
+    from canpar import csv_orders as bb
+    from canpar.client import create_client
+    from canpar.config import get_accounts
+    from canpar.labels import write_label_pdf
+    from canpar.results import open_results_sink, read_results
+    from canpar.shipment_log import update_log_file
+
+    orders_csv = fixtures.write_orders_csv(os.path.join(workdir, "orders.csv"), args.orders, args.seed)
+    for _ in range(args.repeat):
+        with timings.stage("csv_ingest"):
+            df = bb.load_orders(orders_csv)
+    orders = [row.to_dict() for _, row in df.iterrows()]
+
+    accounts_cfg = get_accounts()
+    account = accounts_cfg["accounts"][accounts_cfg["default_account"]]
+    for _ in range(args.repeat):
+        with timings.stage("client_setup"):
+            client, capture = create_client()
+    labels_dir = os.path.join(workdir, "component_labels")
+    os.makedirs(labels_dir, exist_ok=True)
+    log_file = os.path.join(workdir, "component_log.json")
+    results = []
+
+    for order in orders:
+        order_id = str(order["Order number"])
+        with timings.stage("request_build"):
+            request_data = bb.build_shipment_request(client, order, account)
+        with timings.stage("request_serialize"):
+            envelope = client.create_message(client.service, "processShipment", request=request_data)
+            etree.tostring(envelope)
+
+        with timings.stage("soap_process_shipment"):
+            response = client.service.processShipment(request=request_data)
+        shipment = response.processShipmentResult.shipment
+        label_request = client.type_factory('ns1').GetLabelsRq(
+            user_id=account['user'], password=account['password'], id=shipment.id, thermal=False
+        )
+        with timings.stage("soap_get_labels"):
+            label_response = client.service.getLabels(request=label_request)
+
+        with timings.stage("label_decode_write"):
+            write_label_pdf(label_response.labels[0], os.path.join(labels_dir, f"{order_id}.pdf"))
+
+        entry = {"order_id": order_id, "account": account["name"], "timestamp": datetime.now().isoformat(),
+                 "shipment_creation": {"status": "SUCCESS", "shipment_id": shipment.id,
+                                       "tracking_number": shipment.packages[0].barcode},
+                 "label_retrieval": {"status": "SUCCESS"}}
+        with timings.stage("log_update"):
+            update_log_file(log_file, entry)
+
+        results.append({
+            "Order number": order_id, "Customer Name": f"{order['Shipping address first name']} {order['Shipping address last name']}",
+            "SKU": order["Offer SKU"], "Quantity": order["Quantity"], "Account": account["name"],
+            "Tracking Number": shipment.packages[0].barcode, "Shipment API Status": "SUCCESS",
+            "Label API Status": "SUCCESS", "Error Details": "None", "Timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        })
+
+    for _ in range(args.repeat):
+        with timings.stage("summary_export"):
+            with open_results_sink(os.path.join(workdir, "Canpar_Shipment_Summary")) as sink:
+                for record in results:
+                    sink.write(record)
+        with timings.stage("summary_readback"):
+            read_results(sink.path)
+
+def bench_end_to_end(workdir, args, timings):
+    """Runs both workflows over the full fixture batch at the configured concurrency."""
+    from canpar.csv_orders import process_orders
+    from canpar.api_orders import run_shipping_process
+
+    e2e_dir = os.path.join(workdir, "e2e_csv")
+    os.makedirs(e2e_dir, exist_ok=True)
+    orders_csv = fixtures.write_orders_csv(os.path.join(e2e_dir, "orders.csv"), args.orders, args.seed)
+    with timings.stage("process_orders_e2e"):
+        process_orders(orders_csv, e2e_dir)
+
+    logs_dir = os.path.join(workdir, "e2e_json", "logs")
+    pending_dir = os.path.join(logs_dir, "best_buy")
+    os.makedirs(pending_dir, exist_ok=True)
+    fixtures.write_pending_json(os.path.join(pending_dir, "orders_pending_shipping.json"), args.orders, args.seed)
+    with timings.stage("run_shipping_process_e2e"):
+        run_shipping_process(logs_dir)
+
+# ==============================================================================
+# --- REPORTING ---
+# ==============================================================================
+def print_summary(summary):
+    print(f"{'stage':<28}{'count':>7}{'mean ms':>11}{'p95 ms':>11}{'total s':>11}")
+    for name, stats in summary.items():
+        print(f"{name:<28}{stats['count']:>7}{stats['mean_ms']:>11.3f}{stats['p95_ms']:>11.3f}{stats['total_s']:>11.3f}")
+
+def compare(current, baseline_path):
+    with open(baseline_path, "r") as f:
+        baseline = json.load(f)
+    print(f"\nComparison with {baseline_path} (commit {baseline.get('commit')}):")
+    print(f"{'stage':<28}{'base ms':>11}{'now ms':>11}{'change':>9}")
+    regressions = []
+    for name, stats in current["stages"].items():
+        old = baseline.get("stages", {}).get(name)
+        if not old or not old["mean_ms"]:
+            print(f"{name:<28}{'-':>11}{stats['mean_ms']:>11.3f}{'new':>9}")
+            continue
+        change = stats["mean_ms"] / old["mean_ms"] - 1
+        flag = "  <-- slower" if change > REGRESSION_THRESHOLD else ""
+        print(f"{name:<28}{old['mean_ms']:>11.3f}{stats['mean_ms']:>11.3f}{change:>+9.1%}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Canpar shipping path against a local SOAP stub.")
+    parser.add_argument("--orders", type=int, default=100, help="number of synthetic orders")
+    parser.add_argument("--seed", type=int, default=fixtures.DEFAULT_SEED)
+    parser.add_argument("--repeat", type=int, default=3, help="repetitions for the whole-batch stages (ingest, export)")
+    parser.add_argument("--workers", type=int, default=4, help="CANPAR_MAX_WORKERS for the end-to-end runs")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="simulated server latency")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--label-kb", type=int, default=40)
+    parser.add_argument("--skip-e2e", action="store_true", help="only time the individual stages")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    parser.add_argument("--verbose", action="store_true", help="show the scripts' own output")
+    from canpar.profiling import add_profile_argument, profiled, StageTimings
+    add_profile_argument(parser)
+    args = parser.parse_args()
+
+    server, wsdl_url = start_stub(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, label_kb=args.label_kb)
+    workdir = tempfile.mkdtemp(prefix="canpar_bench_")
+    # Must be set before the shared config is first loaded (it is cached afterwards).
+    # The audit trail goes to the work directory so synthetic orders and stub
+    # latencies never reach the real one (Audit_Query.py, dry-run projections).
+    os.environ.update({
+        "CANPAR_AUDIT_DIR": os.path.join(workdir, "audit"),
+        "CANPAR_CONFIG_FILE": os.environ.get("CANPAR_BENCH_CONFIG", os.path.join(BENCH_DIR, "no-config.toml")),
+        "CANPAR_WSDL_URL": wsdl_url,
+        "CANPAR_MAX_WORKERS": str(args.workers),
+        "CANPAR_API_USER": "benchmark",
+        "CANPAR_API_PASSWORD": "benchmark",
+    })
+
+    timings = StageTimings()
+    output = io.StringIO() if not args.verbose else sys.stdout
+    try:
+        with profiled("benchmarks", args.profile), redirect_stdout(output):
+            bench_startup(args, timings)
+            bench_components(workdir, args, timings)
+            if not args.skip_e2e:
+                bench_end_to_end(workdir, args, timings)
+    finally:
+        server.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    commit, dirty = git_revision()
+    result = {
+        "commit": commit, "dirty": dirty, "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(), "platform": platform.platform(),
+        "params": {k: getattr(args, k) for k in ("orders", "seed", "repeat", "workers", "latency_ms", "jitter_ms", "label_kb")},
+        "stages": timings.summary(),
+    }
+    for stage in ("process_orders_e2e", "run_shipping_process_e2e"):
+        if stage in result["stages"]:
+            result["stages"][stage]["orders_per_s"] = round(args.orders / result["stages"][stage]["total_s"], 2)
+
+    print_summary(result["stages"])
+    out_path = args.output or os.path.join(RESULTS_DIR, f"{commit}{'-dirty' if dirty else ''}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    with open(out_path, "w") as f:
+        json.dump(result, f, indent=4)
+    print(f"\nResults saved to: {out_path}")
+
+    if args.compare:
+        return 1 if compare(result, args.compare) else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
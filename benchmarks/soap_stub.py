@@ -0,0 +1,220 @@
+"""
+Local stand-in for Canpar's CanshipBusinessService, used by the benchmarks.
+
+Serves canship_stub.wsdl and answers processShipment / rateShipment / getLabels
+with canned responses after a configurable delay, so the whole shipping path can run
+without network access or real shipments. The add-ons service
+(canpar_addons_stub.wsdl) answers trackByBarcode, moving each barcode one
+scan further along on every call until it is delivered. With a `capacity`,
+calls beyond that many in flight are answered with a fault, like Canpar's
+server-side throttling. Point the scripts at
+it with CANPAR_ENVIRONMENT=stub (default port 8765) or CANPAR_WSDL_URL.
+
+    python benchmarks/soap_stub.py --port 8765 --latency-ms 150 --label-kb 40
+"""
+import os
+import base64
+import random
+import socket
+import argparse
+import itertools
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from lxml import etree
+
+WSDL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "canship_stub.wsdl")
+ADDONS_WSDL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "canpar_addons_stub.wsdl")
+SERVICE_PATH = "/canshipws/services/CanshipBusinessService"
+ADDONS_PATH = "/canshipws/services/CanparAddonsService"
+DEFAULT_PORT = 8765
+
+NS_SOAP = "http://schemas.xmlsoap.org/soap/envelope/"
+NS_BUSINESS = "http://ws.business.canshipws.canpar.com"
+NS_REQUEST = "http://ws.dto.canshipws.canpar.com/xsd"
+NS_DATA = "http://dto.canshipws.canpar.com/xsd"
+NS_ADDONS = "http://ws.onlinerating.canshipws.canpar.com"
+
+# rateShipment quotes a flat base plus a per-pound charge.
+STUB_BASE_RATE = 9.75
+STUB_RATE_PER_LB = 0.85
+
+# Scans returned by trackByBarcode, one more per call: (code, description, city).
+TRACKING_SCANS = [
+    ("PIC", "PICKED UP", "NORTH YORK"),
+    ("ARR", "ARRIVED AT TERMINAL", "CONCORD"),
+    ("OFD", "OUT FOR DELIVERY", "MISSISSAUGA"),
+    ("DEL", "DELIVERED", "MISSISSAUGA"),
+]
+
+SHIPMENT_RESPONSE = """<soapenv:Envelope xmlns:soapenv="{soap}"><soapenv:Body>
+<ns:processShipmentResponse xmlns:ns="{business}" xmlns:ax1="{request}" xmlns:ax2="{data}"><ns:return>
+<ax1:error xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:nil="true"/>
+<ax1:processShipmentResult><ax2:shipment>
+<ax2:id>{shipment_id}</ax2:id><ax2:order_id>{order_id}</ax2:order_id>
+<ax2:packages><ax2:barcode>{barcode}</ax2:barcode></ax2:packages>
+</ax2:shipment></ax1:processShipmentResult>
+</ns:return></ns:processShipmentResponse>
+</soapenv:Body></soapenv:Envelope>"""
+
+RATE_RESPONSE = """<soapenv:Envelope xmlns:soapenv="{soap}"><soapenv:Body>
+<ns:rateShipmentResponse xmlns:ns="{business}" xmlns:ax1="{request}" xmlns:ax2="{data}"><ns:return>
+<ax1:error xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:nil="true"/>
+<ax1:processShipmentResult><ax2:shipment><ax2:total>{total:.2f}</ax2:total></ax2:shipment></ax1:processShipmentResult>
+</ns:return></ns:rateShipmentResponse>
+</soapenv:Body></soapenv:Envelope>"""
+
+LABELS_RESPONSE = """<soapenv:Envelope xmlns:soapenv="{soap}"><soapenv:Body>
+<ns:getLabelsResponse xmlns:ns="{business}" xmlns:ax1="{request}"><ns:return>
+<ax1:error xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:nil="true"/>
+<ax1:labels>{label}</ax1:labels>
+</ns:return></ns:getLabelsResponse>
+</soapenv:Body></soapenv:Envelope>"""
+
+TRACKING_RESPONSE = """<soapenv:Envelope xmlns:soapenv="{soap}"><soapenv:Body>
+<ns:trackByBarcodeResponse xmlns:ns="{addons}" xmlns:ax1="{request}" xmlns:ax2="{data}"><ns:return>
+<ax1:error xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:nil="true"/>
+<ax1:result><ax2:barcode>{barcode}</ax2:barcode>{events}</ax1:result>
+</ns:return></ns:trackByBarcodeResponse>
+</soapenv:Body></soapenv:Envelope>"""
+
+TRACKING_EVENT = """<ax2:events><ax2:address><ax2:city>{city}</ax2:city><ax2:province>ON</ax2:province></ax2:address>
+<ax2:code>{code}</ax2:code><ax2:code_description_en>{description}</ax2:code_description_en>
+<ax2:local_date_time>{timestamp}</ax2:local_date_time></ax2:events>"""
+
+FAULT_RESPONSE = """<soapenv:Envelope xmlns:soapenv="{soap}"><soapenv:Body>
+<soapenv:Fault><faultcode>soapenv:Server</faultcode><faultstring>{message}</faultstring></soapenv:Fault>
+</soapenv:Body></soapenv:Envelope>"""
+
+def fake_label(size_kb):
+    """Returns a base64 PDF-like payload of roughly `size_kb` kilobytes."""
+    body = b"%PDF-1.4\n% canpar stub label\n" + os.urandom(max(0, size_kb * 1024 - 40)) + b"\n%%EOF\n"
+    return base64.b64encode(body).decode("ascii")
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        # Headers and body go out as separate writes; without TCP_NODELAY every
+        # response would pay a delayed-ACK stall and skew the round-trip numbers.
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.startswith(SERVICE_PATH):
+            path, template = SERVICE_PATH, self.server.wsdl_template
+        elif self.path.startswith(ADDONS_PATH):
+            path, template = ADDONS_PATH, self.server.addons_wsdl_template
+        else:
+            self._send(404, "text/plain", "not found")
+            return
+        host, port = self.server.server_address[:2]
+        wsdl = template.replace("{service_address}", f"http://{host}:{port}{path}")
+        self._send(200, "text/xml; charset=utf-8", wsdl)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        stub = self.server
+        with stub.lock:
+            stub.in_flight += 1
+            throttled = stub.capacity and stub.in_flight > stub.capacity
+        try:
+            delay = max(0.0, random.gauss(stub.latency_ms, stub.jitter_ms)) / 1000.0
+            time.sleep(delay)
+        finally:
+            with stub.lock:
+                stub.in_flight -= 1
+
+        if throttled:
+            self._send(500, "text/xml; charset=utf-8", FAULT_RESPONSE.format(soap=NS_SOAP, message="Too many requests"))
+            return
+        if stub.fault_rate and random.random() < stub.fault_rate:
+            self._send(500, "text/xml; charset=utf-8", FAULT_RESPONSE.format(soap=NS_SOAP, message="Service temporarily unavailable"))
+            return
+
+        operation = etree.fromstring(body).find(f"{{{NS_SOAP}}}Body")[0]
+        names = dict(soap=NS_SOAP, business=NS_BUSINESS, request=NS_REQUEST, data=NS_DATA, addons=NS_ADDONS)
+        if etree.QName(operation).localname == "processShipment":
+            order_id = operation.findtext(f".//{{{NS_DATA}}}order_id") or ""
+            shipment_id = next(stub.ids)
+            xml = SHIPMENT_RESPONSE.format(shipment_id=shipment_id, order_id=order_id,
+                                           barcode=f"D420{shipment_id:011d}", **names)
+        elif etree.QName(operation).localname == "rateShipment":
+            weight = sum(float(node.text or 0) for node in operation.iterfind(f".//{{{NS_DATA}}}reported_weight"))
+            xml = RATE_RESPONSE.format(total=STUB_BASE_RATE + STUB_RATE_PER_LB * weight, **names)
+        elif etree.QName(operation).localname == "getLabels":
+            xml = LABELS_RESPONSE.format(label=stub.label, **names)
+        elif etree.QName(operation).localname == "trackByBarcode":
+            barcode = operation.findtext(f".//{{{NS_REQUEST}}}barcode") or ""
+            xml = TRACKING_RESPONSE.format(barcode=barcode, events=stub.tracking_events(barcode), **names)
+        else:
+            xml = FAULT_RESPONSE.format(soap=NS_SOAP, message=f"Unknown operation {etree.QName(operation).localname}")
+            self._send(500, "text/xml; charset=utf-8", xml)
+            return
+        self._send(200, "text/xml; charset=utf-8", xml)
+
+    def _send(self, status, content_type, text):
+        payload = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def tracking_events(self, barcode):
+        """Advances `barcode` by one scan and returns all of its scans so far, newest first."""
+        with self.lock:
+            seen = self.tracking_progress[barcode] = min(len(TRACKING_SCANS), self.tracking_progress.get(barcode, 0) + 1)
+            started = self.tracking_started.setdefault(barcode, time.time())
+        events = []
+        for step, (code, description, city) in enumerate(TRACKING_SCANS[:seen]):
+            timestamp = time.strftime("%Y%m%d %H%M%S", time.localtime(started + step * 3600))
+            events.append(TRACKING_EVENT.format(code=code, description=description, city=city, timestamp=timestamp))
+        return "".join(reversed(events))
+
+def start_stub(port=0, latency_ms=0.0, jitter_ms=0.0, label_kb=40, fault_rate=0.0, capacity=0):
+    """Starts the stub in a background thread. Returns (server, wsdl_url); call server.shutdown() to stop."""
+    server = StubServer(("127.0.0.1", port), StubHandler)
+    with open(WSDL_FILE, "r") as f:
+        server.wsdl_template = f.read()
+    with open(ADDONS_WSDL_FILE, "r") as f:
+        server.addons_wsdl_template = f.read()
+    server.lock = threading.Lock()
+    server.tracking_progress = {}
+    server.tracking_started = {}
+    server.latency_ms = latency_ms
+    server.jitter_ms = jitter_ms
+    server.fault_rate = fault_rate
+    server.capacity = capacity
+    server.in_flight = 0
+    server.label = fake_label(label_kb)
+    server.ids = itertools.count(1000001)
+    threading.Thread(target=server.serve_forever, name="canpar-soap-stub", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}{SERVICE_PATH}?wsdl"
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Canpar SOAP stub for benchmarks and dry runs.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency-ms", type=float, default=150.0, help="mean simulated server latency")
+    parser.add_argument("--jitter-ms", type=float, default=30.0, help="standard deviation of the latency")
+    parser.add_argument("--label-kb", type=int, default=40, help="size of the returned PDF label")
+    parser.add_argument("--fault-rate", type=float, default=0.0, help="fraction of calls answered with a SOAP fault")
+    parser.add_argument("--capacity", type=int, default=0, help="calls in flight before the stub throttles (0 = unlimited)")
+    args = parser.parse_args()
+    server, wsdl_url = start_stub(args.port, args.latency_ms, args.jitter_ms, args.label_kb, args.fault_rate,
+                                  args.capacity)
+    print(f"Canpar SOAP stub listening, WSDL at {wsdl_url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+"""Shared Canpar shipping helpers used by the order processing scripts."""
+
+import os
+
+# Relative paths in the config (WSDL cache, catalog, audit trail, tracking DB,
+# profiles) resolve against the repository root, not the working directory.
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -0,0 +1,239 @@
+import heapq
+import queue
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from canpar.ratelimit import AdaptiveLimiter, LimiterPlugin
+
+# ==============================================================================
+# --- CONFIGURATION ---
+# ==============================================================================
+DEFAULT_ACCOUNT_NAME = "default"
+DEFAULT_MAX_WORKERS = 1
+DEFAULT_MAX_CALLS_PER_SECOND = 0  # 0 disables throttling
+DEFAULT_BURST = 1
+DEFAULT_ADAPTIVE = True  # AIMD concurrency control, see canpar/ratelimit.py
+ROUTE_CRITERIA = ("skus", "sku_prefixes", "provinces", "postal_prefixes")
+
+# ==============================================================================
+# --- ACCOUNT PARSING ---
+# ==============================================================================
+def parse_accounts(raw, source="config"):
+    """
+    Validates shipper accounts and routing rules.
+
+    Returns a dict with "accounts" (name -> account), "routes" (ordered list of
+    rules) and "default_account". Accounts are normally resolved from the
+    shared config by `canpar.config.get_accounts()`.
+    """
+    accounts = {}
+    for name, account in raw.get("accounts", {}).items():
+        accounts[name] = _normalize_account(name, account)
+    if not accounts:
+        raise ValueError(f"No accounts defined in {source}")
+
+    default_account = raw.get("default_account") or next(iter(accounts))
+    routes = [_normalize_route(route) for route in raw.get("routes", [])]
+    for route in [{"account": default_account}] + routes:
+        if route.get("account") not in accounts:
+            raise ValueError(f"Route refers to unknown account: {route.get('account')}")
+
+    return {"accounts": accounts, "routes": routes, "default_account": default_account}
+
+def _normalize_account(name, account):
+    """Fills in defaults and checks the fields every account needs."""
+    missing = [key for key in ("user", "password", "shipper_num", "pickup_address") if not account.get(key)]
+    if missing:
+        raise ValueError(f"Account '{name}' is missing: {', '.join(missing)}")
+    normalized = dict(account)
+    normalized["name"] = name
+    normalized["max_workers"] = max(1, int(account.get("max_workers", DEFAULT_MAX_WORKERS)))
+    normalized["max_calls_per_second"] = float(account.get("max_calls_per_second", DEFAULT_MAX_CALLS_PER_SECOND))
+    normalized["burst"] = max(1, int(account.get("burst", DEFAULT_BURST)))
+    normalized["adaptive"] = bool(account.get("adaptive", DEFAULT_ADAPTIVE))
+    return normalized
+
+def _normalize_route(route):
+    """Checks a routing rule: known keys only, at least one criterion, and each criterion a list of strings."""
+    if not isinstance(route, dict):
+        raise ValueError(f"Route must be a table, got {route!r}")
+    account = route.get("account")
+    unknown = sorted(set(route) - {"account", *ROUTE_CRITERIA})
+    if unknown:
+        raise ValueError(f"Route to '{account}' has unknown keys: {', '.join(unknown)} "
+                         f"(expected account and any of {', '.join(ROUTE_CRITERIA)})")
+    criteria = [key for key in ROUTE_CRITERIA if key in route]
+    if not criteria:
+        raise ValueError(f"Route to '{account}' has no criteria; it would match every order "
+                         f"(use default_account for a catch-all)")
+    normalized = dict(route)
+    for key in criteria:
+        values = route[key]
+        if not isinstance(values, (list, tuple)) or not values or isinstance(values, str):
+            raise ValueError(f"Route to '{account}': {key} must be a non-empty list, got {values!r}")
+        normalized[key] = [str(value) for value in values]
+    return normalized
+
+# ==============================================================================
+# --- ROUTING ---
+# ==============================================================================
+def csv_routing_keys(order):
+    """Extracts (sku, province, postal_code) from a Best Buy CSV export row."""
+    return (
+        str(order.get("Offer SKU") or ""),
+        str(order.get("Shipping address state") or ""),
+        str(order.get("Shipping address zip") or ""),
+    )
+
+def api_routing_keys(order):
+    """Extracts (sku, province, postal_code) from a Best Buy API order."""
+    lines = order.get("order_lines") or [{}]
+    shipping_addr = order.get("customer", {}).get("shipping_address", {})
+    return (
+        str(lines[0].get("offer_sku") or ""),
+        str(shipping_addr.get("state") or ""),
+        str(shipping_addr.get("zip_code") or ""),
+    )
+
+def route_matches(route, sku, province, postal_code):
+    """Checks a single routing rule. Every criterion present on the rule must match."""
+    postal_code = postal_code.replace(" ", "").upper()
+    if "skus" in route and sku not in route["skus"]:
+        return False
+    if "sku_prefixes" in route and not any(sku.startswith(p) for p in route["sku_prefixes"]):
+        return False
+    if "provinces" in route and province.upper() not in [p.upper() for p in route["provinces"]]:
+        return False
+    if "postal_prefixes" in route and not any(postal_code.startswith(p.upper()) for p in route["postal_prefixes"]):
+        return False
+    return True
+
+def route_order(order, accounts_cfg, routing_keys):
+    """Returns the name of the account that should ship `order`. First matching rule wins."""
+    sku, province, postal_code = routing_keys(order)
+    for route in accounts_cfg["routes"]:
+        if route_matches(route, sku, province, postal_code):
+            return route["account"]
+    return accounts_cfg["default_account"]
+
+def shard_orders(orders, accounts_cfg, routing_keys, account_of=None):
+    """
+    Splits orders into per-account lists of (index, order), keeping input order inside each shard.
+
+    `account_of(order)`, when given, names the account directly instead of the routing rules;
+    unknown names fall back to the default account.
+    """
+    shards = {name: [] for name in accounts_cfg["accounts"]}
+    for index, order in enumerate(orders):
+        name = account_of(order) if account_of else route_order(order, accounts_cfg, routing_keys)
+        if name not in shards:
+            name = accounts_cfg["default_account"]
+        shards[name].append((index, order))
+    return {name: shard for name, shard in shards.items() if shard}
+
+# ==============================================================================
+# --- PER-ACCOUNT CLIENTS AND RATE LIMITS ---
+# ==============================================================================
+class ClientPool:
+    """
+    A fixed-size pool of SOAP clients for one account.
+
+    `client_factory(plugins)` must return a (client, capture) pair; clients are
+    created lazily so an account without orders never loads the WSDL. Every
+    call made through the pool's clients goes through the account's limiter.
+    """
+
+    def __init__(self, account, client_factory):
+        self.account = account
+        self.client_factory = client_factory
+        self.size = account["max_workers"]
+        self.limiter = AdaptiveLimiter(self.size, account.get("max_calls_per_second", DEFAULT_MAX_CALLS_PER_SECOND),
+                                       account.get("burst", DEFAULT_BURST), account.get("adaptive", DEFAULT_ADAPTIVE))
+        self.idle = queue.LifoQueue()
+        self.created = 0
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def checkout(self):
+        try:
+            entry = self.idle.get_nowait()
+        except queue.Empty:
+            entry = self._create()
+        handle, plugin = entry
+        try:
+            yield handle
+        finally:
+            plugin.abandon()
+            self.idle.put(entry)
+
+    def _create(self):
+        with self.lock:
+            pool_full = self.created >= self.size
+            if not pool_full:
+                self.created += 1
+        if pool_full:
+            return self.idle.get()
+        plugin = LimiterPlugin(self.limiter)
+        try:
+            return self.client_factory([plugin]), plugin
+        except Exception:
+            with self.lock:
+                self.created -= 1
+            raise
+
+# ==============================================================================
+# --- SHARDED EXECUTION ---
+# ==============================================================================
+def run_sharded(orders, accounts_cfg, routing_keys, client_factory, worker, batch_size=0, priority=None,
+                account_of=None):
+    """
+    Routes every order to its account and processes all accounts in parallel.
+
+    Each account gets its own client pool and `max_workers` threads, so total
+    throughput grows with the number of accounts. `worker(account, client,
+    capture, order)` is called once per order; results come back in input order.
+    With a positive `batch_size`, orders are submitted in batches of that size
+    and each batch finishes before the next starts; pools are reused across batches.
+    With a `priority(order)` key, orders are submitted lowest key first (and
+    batched in that order) instead of in input order. See `shard_orders` for
+    `account_of`.
+    """
+    results = [None] * len(orders)
+    sequence = priority_sequence(orders, priority) if priority else list(range(len(orders)))
+    batch_size = batch_size or len(orders) or 1
+    pools = {}
+    executors = {}
+    try:
+        for start in range(0, len(orders), batch_size):
+            positions = sequence[start:start + batch_size]
+            batch = [orders[position] for position in positions]
+            if batch_size < len(orders):
+                print(f"INFO: Processing batch {start // batch_size + 1} ({len(batch)} orders).")
+            futures = []
+            for name, shard in shard_orders(batch, accounts_cfg, routing_keys, account_of).items():
+                if name not in pools:
+                    account = accounts_cfg["accounts"][name]
+                    pools[name] = ClientPool(account, client_factory)
+                    executors[name] = ThreadPoolExecutor(max_workers=account["max_workers"], thread_name_prefix=f"canpar-{name}")
+                print(f"INFO: Account '{name}' will process {len(shard)} orders with {pools[name].size} workers.")
+                for index, order in shard:
+                    futures.append((positions[index], executors[name].submit(_run_one, pools[name], worker, order)))
+            for position, future in futures:
+                results[position] = future.result()
+    finally:
+        for executor in executors.values():
+            executor.shutdown(wait=True)
+        for name, pool in pools.items():
+            pool.limiter.report(name)
+    return results
+
+def priority_sequence(orders, priority):
+    """Returns the positions of `orders` as popped from a priority queue: lowest key first, ties in input order."""
+    heap = [(priority(order), position) for position, order in enumerate(orders)]
+    heapq.heapify(heap)
+    return [heapq.heappop(heap)[1] for _ in range(len(heap))]
+
+def _run_one(pool, worker, order):
+    with pool.checkout() as (client, capture):
+        return worker(pool.account, client, capture, order)
@@ -0,0 +1,180 @@
+import os
+import json
+from datetime import datetime
+
+from canpar.accounts import api_routing_keys, run_sharded
+from canpar.audit import get_audit_log, audited_fields
+from canpar.config import get_config, get_accounts, ConfigError
+from canpar.catalog import get_catalog, api_order_lines
+from canpar.client import client_factory, save_xml_response
+from canpar.labels import get_canpar_label
+from canpar.scheduling import SlaReport, api_deadline, deadline_priority
+from canpar.shipment_log import LOG_FILE_NAME, setup_log_directories, update_log_file
+
+# ==============================================================================
+# --- CONFIGURATION ---
+# ==============================================================================
+# Shipping path for orders pulled from the Best Buy API
+# (logs/best_buy/orders_pending_shipping.json), used by
+# jules_bb_python/shipping/monolithic_process_shipments.py.
+CANPAR_CARRIER_CODE = "CPAR"
+PENDING_FILE_NAME = "orders_pending_shipping.json"
+
+# ==============================================================================
+# --- CANPAR CALLS ---
+# ==============================================================================
+def build_shipment_request(client, order, creds):
+    """Builds the ProcessShipmentRq for one Best Buy API order."""
+    config = get_config()
+    order_id = order['order_id']
+    req_factory, data_factory = client.type_factory('ns1'), client.type_factory('ns2')
+    customer_info = order['customer']
+    shipping_addr = customer_info['shipping_address']
+    package_dims = get_catalog().package_for(api_order_lines(order))
+
+    return req_factory.ProcessShipmentRq(
+        user_id=creds['user'], password=creds['password'],
+        shipment=data_factory.Shipment(
+            shipper_num=creds['shipper_num'], shipping_date=datetime.now(), service_type=config.canpar.service_type,
+            pickup_address=data_factory.Address(**creds['pickup_address']),
+            delivery_address=data_factory.Address(
+                name=f"{customer_info['firstname']} {customer_info['lastname']}",
+                address_line_1=shipping_addr['street_1'], city=shipping_addr['city'],
+                province=shipping_addr['state'], postal_code=shipping_addr['zip_code'],
+                country=shipping_addr['country_iso_code'], phone=shipping_addr['phone']
+            ),
+            packages=[data_factory.Package(
+                reported_weight=package_dims['weight_lbs'], length=package_dims['length'], width=package_dims['width'],
+                height=package_dims['height'], declared_value=float(order['total_price'])
+            )],
+            order_id=order_id, dimention_unit='I', reported_weight_unit='L',
+            nsr=not config.canpar.signature_required, description=f"Order {order_id}"
+        )
+    )
+
+def create_canpar_shipment(client, capture, order, creds, xml_dir):
+    result = _create_canpar_shipment(client, order, creds)
+    xml_path = save_xml_response(capture, xml_dir, order['order_id'], "create_shipment")
+    if xml_path:
+        result["xml_path"] = xml_path
+    return result
+
+def _create_canpar_shipment(client, order, creds):
+    order_id = order['order_id']
+    print(f"INFO: Attempting to create Canpar shipment for order {order_id}...")
+    try:
+        request_data = build_shipment_request(client, order, creds)
+        response = client.service.processShipment(request=request_data)
+
+        if response and response.error is None:
+            res = response.processShipmentResult.shipment
+            tracking_num = res.packages[0].barcode
+            print(f"SUCCESS: Canpar shipment created for {order_id}. Tracking: {tracking_num}")
+            return {"status": "SUCCESS", "shipment_id": res.id, "tracking_number": tracking_num}
+
+        error_msg = response.error if response else "Empty or malformed response"
+        print(f"ERROR: Canpar API returned an error for order {order_id}: {error_msg}")
+        return {"status": "API_ERROR", "error": str(error_msg)}
+
+    except Exception as e:
+        print(f"ERROR: An exception occurred while creating shipment for {order_id}: {e}")
+        return {"status": "EXCEPTION", "error": str(e)}
+
+# ==============================================================================
+# --- MAIN WORKFLOW ---
+# ==============================================================================
+def run_shipping_process(logs_dir, dry_run=False, rate=False):
+    """
+    Ships every order in the pending file, logging each to the shipment log.
+
+    With `dry_run`, only checks the orders and projects the run (see
+    canpar/dry_run.py); `rate` adds a rateShipment quote per order.
+    """
+    print("\n--- Starting Failsafe Monolithic Canpar Shipment Processing Script ---")
+
+    try:
+        accounts_cfg = get_accounts()
+    except ConfigError as e:
+        print(f"FATAL: {e}")
+        return
+
+    bb_logs_dir = os.path.join(logs_dir, 'best_buy')
+    os.makedirs(bb_logs_dir, exist_ok=True)
+    canpar_logs_dir, xml_dir, pdf_dir, failed_labels_dir = setup_log_directories(logs_dir)
+    pending_shipping_file = os.path.join(bb_logs_dir, PENDING_FILE_NAME)
+    canpar_log_file = os.path.join(canpar_logs_dir, LOG_FILE_NAME)
+
+    if not os.path.exists(pending_shipping_file):
+        print(f"INFO: Pending shipping file not found at {pending_shipping_file}. Nothing to process.")
+        return
+
+    with open(pending_shipping_file, 'r') as f:
+        try:
+            pending_orders = json.load(f)
+        except json.JSONDecodeError:
+            print(f"ERROR: Could not parse {pending_shipping_file}. Exiting.")
+            return
+
+    print(f"INFO: Loaded {len(pending_orders)} orders from pending file.")
+    if dry_run:
+        from canpar.dry_run import dry_run_orders
+        try:
+            dry_run_orders(pending_orders, accounts_cfg, api_routing_keys, build_shipment_request,
+                           lambda order: order['order_id'],
+                           lambda order: (order['customer'].get('firstname'), order['customer'].get('lastname')),
+                           rate=rate)
+        except Exception as e:
+            print(f"\nFATAL ERROR during dry run: {str(e)}")
+        return
+
+    audit = get_audit_log()
+    sla = SlaReport()
+
+    def process_order(account, client, capture, order):
+        order_id = order['order_id']
+        log_entry = {"order_id": order_id, "account": account['name'], "timestamp": datetime.now().isoformat()}
+        skus = [str(offer_sku) for offer_sku, _, _ in api_order_lines(order) if offer_sku]
+        context = {"source": "api", "sku": skus[0] if skus else None, "skus": skus if len(skus) > 1 else None,
+                   "account": account['name']}
+
+        with audit.stage(order_id, "order", **context) as order_event:
+            with audit.stage(order_id, "shipment", **context) as event:
+                shipment_res = create_canpar_shipment(client, capture, order, account, xml_dir)
+                event.update(audited_fields(shipment_res, "status", "shipment_id", "tracking_number", "error", "xml_path"))
+            log_entry['shipment_creation'] = shipment_res
+
+            if shipment_res['status'] == 'SUCCESS':
+                shipment_id = shipment_res['shipment_id']
+                with audit.stage(order_id, "label", tracking_number=shipment_res['tracking_number'], **context) as event:
+                    label_res = get_canpar_label(client, capture, shipment_id, order_id, account, pdf_dir, xml_dir,
+                                                 failed_labels_dir, request_type="get_label")
+                    event.update(audited_fields(label_res, "status", "error", "label_path", "xml_path", "failed_path"))
+                log_entry['label_retrieval'] = label_res
+            else:
+                log_entry['label_retrieval'] = {"status": "SKIPPED", "reason": "Shipment creation failed."}
+
+            update_log_file(canpar_log_file, log_entry)
+            label_res = log_entry['label_retrieval']
+            deadline = api_deadline(order)
+            on_time = sla.record(order_id, deadline, label_res['status'] == 'SUCCESS')
+            order_event.update(status="SHIPPED" if label_res['status'] == 'SUCCESS' else "FAILED",
+                               tracking_number=shipment_res.get('tracking_number'), log_path=canpar_log_file,
+                               error=shipment_res.get('error') or label_res.get('error') or label_res.get('reason'),
+                               deadline=deadline.isoformat() if deadline else None, on_time=on_time)
+        print(f"--- Finished processing for order {order_id} ---")
+        return log_entry
+
+    get_catalog().load()  # once, before the workers share it
+    runtime = get_config().runtime
+    sla.plan(pending_orders, api_deadline, runtime.schedule == "deadline")
+    try:
+        run_sharded(pending_orders, accounts_cfg, api_routing_keys, client_factory, process_order,
+                    batch_size=runtime.batch_size,
+                    priority=deadline_priority(api_deadline) if runtime.schedule == "deadline" else None)
+    except RuntimeError as e:
+        print(f"FATAL: {e}")
+        return
+
+    sla.print_report()
+    get_catalog().print_report()
+    print("\n--- Monolithic Script Finished ---")
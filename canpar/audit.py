@@ -0,0 +1,237 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+import functools
+from contextlib import contextmanager
+from datetime import datetime
+
+from canpar import REPO_ROOT
+from canpar.config import get_config
+
+# ==============================================================================
+# --- CONFIGURATION ---
+# ==============================================================================
+# One JSON line per stage transition, in one file per day:
+#   audit/audit-2026-10-19.jsonl
+# The JSONL files are the record; index.sqlite next to them is rebuilt from them
+# incrementally (only bytes appended since the last query are read).
+FILE_PREFIX = "audit-"
+FILE_SUFFIX = ".jsonl"
+INDEX_FILE = "index.sqlite"
+INDEXED_FIELDS = ("ts", "run_id", "source", "order_id", "stage", "status", "sku", "account", "tracking_number", "duration_ms")
+INDEX_VERSION = 2  # bump when the schema changes; older indexes are rebuilt from the JSONL files
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    ts TEXT NOT NULL,
+    day TEXT NOT NULL,
+    run_id TEXT,
+    source TEXT,
+    order_id TEXT,
+    stage TEXT,
+    status TEXT,
+    sku TEXT,
+    account TEXT,
+    tracking_number TEXT,
+    duration_ms REAL,
+    file TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_order ON events (order_id, ts);
+CREATE INDEX IF NOT EXISTS events_day ON events (day);
+CREATE INDEX IF NOT EXISTS events_status ON events (status, day);
+CREATE TABLE IF NOT EXISTS event_skus (
+    event_id INTEGER NOT NULL,
+    sku TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS event_skus_sku ON event_skus (sku, event_id);
+CREATE INDEX IF NOT EXISTS events_tracking ON events (tracking_number);
+CREATE TABLE IF NOT EXISTS files (
+    name TEXT PRIMARY KEY,
+    indexed_bytes INTEGER NOT NULL
+);
+"""
+
+# ==============================================================================
+# --- WRITING ---
+# ==============================================================================
+class AuditLog:
+    """
+    Appends per-order stage events to the day's JSONL file.
+
+    Every event carries the run id, order id, stage, status and timing, plus
+    references (paths) to the payloads written elsewhere: XML responses, label
+    PDFs, invalid label dumps. Safe to use from worker threads.
+    """
+
+    def __init__(self, directory, enabled=True):
+        self.directory = directory
+        self.enabled = enabled
+        self.run_id = f"{datetime.now():%Y%m%dT%H%M%S}-{os.getpid()}"
+        self.lock = threading.Lock()
+        if enabled:
+            os.makedirs(directory, exist_ok=True)
+
+    def record(self, order_id, stage, status, **fields):
+        if not self.enabled:
+            return
+        now = datetime.now()
+        event = {"ts": now.isoformat(timespec="milliseconds"), "run_id": self.run_id, "order_id": str(order_id),
+                 "stage": stage, "status": status}
+        event.update((key, value) for key, value in fields.items() if value is not None)
+        for key in event:
+            if key.endswith("_path") and isinstance(event[key], str):
+                event[key] = os.path.abspath(event[key])  # payload refs must not depend on the working directory
+        line = json.dumps(event, default=str, ensure_ascii=False) + "\n"
+        path = os.path.join(self.directory, f"{FILE_PREFIX}{now:%Y-%m-%d}{FILE_SUFFIX}")
+        with self.lock:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    @contextmanager
+    def stage(self, order_id, stage, **fields):
+        """
+        Times the enclosed block and records it as one event.
+
+        The block fills in the yielded dict (status, refs, ids); an exception is
+        recorded with status EXCEPTION and re-raised.
+        """
+        event = dict(fields)
+        start = time.perf_counter()
+        try:
+            yield event
+        except Exception as e:
+            event.update(status="EXCEPTION", error=str(e))
+            raise
+        finally:
+            event["duration_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            self.record(order_id, stage, event.pop("status", "UNKNOWN"), **event)
+
+def resolve_audit_dir():
+    path = get_config().audit.dir
+    return path if os.path.isabs(path) else os.path.join(REPO_ROOT, path)
+
+@functools.lru_cache(maxsize=None)
+def get_audit_log():
+    """Returns the process-wide audit log configured under [audit]."""
+    return AuditLog(resolve_audit_dir(), get_config().audit.enabled)
+
+def audited_fields(result, *keys):
+    """Picks the ids and payload references worth keeping from a workflow result dict."""
+    return {key: result.get(key) for key in keys if result.get(key) is not None}
+
+# ==============================================================================
+# --- INDEX AND QUERIES ---
+# ==============================================================================
+class AuditIndex:
+    """
+    SQLite index over the JSONL files; queries return the original JSON events.
+
+    Every SKU of an event ("sku" plus the "skus" of multi-line orders) goes in
+    event_skus, so a SKU query also finds orders that match on a later line.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.connection = sqlite3.connect(os.path.join(directory, INDEX_FILE))
+        self.connection.row_factory = sqlite3.Row
+        if self.connection.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:
+            self.connection.executescript("DROP TABLE IF EXISTS events; DROP TABLE IF EXISTS event_skus; "
+                                          "DROP TABLE IF EXISTS files;")
+            self.connection.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+        self.connection.executescript(INDEX_SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def sync(self):
+        """Indexes every complete line appended since the last sync. Returns the number of new events."""
+        indexed = dict(self.connection.execute("SELECT name, indexed_bytes FROM files").fetchall())
+        added = 0
+        with self.connection:
+            for name in sorted(os.listdir(self.directory)):
+                if not (name.startswith(FILE_PREFIX) and name.endswith(FILE_SUFFIX)):
+                    continue
+                start = indexed.get(name, 0)
+                if os.path.getsize(os.path.join(self.directory, name)) <= start:
+                    continue
+                rows, end = self._read_new_lines(name, start)
+                for row, skus in rows:
+                    event_id = self.connection.execute(
+                        f"INSERT INTO events (day, {', '.join(INDEXED_FIELDS)}, file, offset, length) "
+                        f"VALUES (?, {', '.join('?' * len(INDEXED_FIELDS))}, ?, ?, ?)", row).lastrowid
+                    self.connection.executemany("INSERT INTO event_skus (event_id, sku) VALUES (?, ?)",
+                                                [(event_id, sku) for sku in skus])
+                self.connection.execute("INSERT OR REPLACE INTO files (name, indexed_bytes) VALUES (?, ?)", (name, end))
+                added += len(rows)
+        return added
+
+    def _read_new_lines(self, name, start):
+        day = name[len(FILE_PREFIX):-len(FILE_SUFFIX)]
+        rows = []
+        offset = start
+        with open(os.path.join(self.directory, name), "rb") as f:
+            f.seek(start)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # a writer is mid-line; pick it up next time
+                try:
+                    event = json.loads(raw)
+                except ValueError:
+                    event = None
+                if isinstance(event, dict):
+                    rows.append(((day, *[event.get(field) for field in INDEXED_FIELDS], name, offset, len(raw)),
+                                 _event_skus(event)))
+                offset += len(raw)
+        return rows, offset
+
+    def query(self, order_id=None, since=None, until=None, status=None, sku=None, stage=None, account=None,
+              tracking_number=None, limit=None):
+        """Returns matching events (full JSON, oldest first). Dates are YYYY-MM-DD and inclusive."""
+        clauses, params = [], []
+        for column, value in (("order_id", order_id), ("status", status), ("stage", stage),
+                              ("account", account), ("tracking_number", tracking_number)):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if sku:
+            clauses.append("id IN (SELECT event_id FROM event_skus WHERE sku = ?)")
+            params.append(sku)
+        if since:
+            clauses.append("day >= ?")
+            params.append(since)
+        if until:
+            clauses.append("day <= ?")
+            params.append(until)
+        sql = "SELECT id, ts, file, offset, length FROM events"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        if limit:  # the most recent `limit` events, still returned oldest first
+            sql = f"SELECT * FROM ({sql} ORDER BY ts DESC, id DESC LIMIT ?) ORDER BY ts, id"
+            params.append(limit)
+        else:
+            sql += " ORDER BY ts, id"
+        return self._load(self.connection.execute(sql, params).fetchall())
+
+    def _load(self, rows):
+        files = {}
+        try:
+            events = []
+            for row in rows:
+                f = files.get(row["file"])
+                if f is None:
+                    f = files[row["file"]] = open(os.path.join(self.directory, row["file"]), "rb")
+                f.seek(row["offset"])
+                events.append(json.loads(f.read(row["length"])))
+            return events
+        finally:
+            for f in files.values():
+                f.close()
+
+def _event_skus(event):
+    skus = [event.get("sku")] + list(event.get("skus") or [])
+    return sorted({str(sku) for sku in skus if sku})
@@ -0,0 +1,52 @@
+import threading
+
+from zeep import Transport
+
+# ==============================================================================
+# --- RESPONSE CAPTURE ---
+# ==============================================================================
+# zeep's HistoryPlugin keeps the last sent and received envelopes as parsed lxml
+# trees (base64 label PDFs included) for as long as the client lives, and a
+# client shared by several threads records whichever call finished last.
+# Instead, the transport hands the raw response body to the capture of the call
+# that sent it, which keeps it only until the archiver takes it.
+_calling = threading.local()  # the capture whose call is being sent on this thread
+
+class ResponseCapture:
+    """
+    Zeep plugin that holds the raw response body of each thread's current call.
+
+    `take()` returns the body of the calling thread's last call and forgets it.
+    A body nobody took is dropped when the same thread sends its next call, so
+    at most one body per thread is ever held.
+    """
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def egress(self, envelope, http_headers, operation, binding_options):
+        self.local.body = None
+        _calling.capture = self
+        return envelope, http_headers
+
+    def ingress(self, envelope, http_headers, operation):
+        return envelope, http_headers
+
+    def received(self, body):
+        self.local.body = body
+
+    def take(self):
+        body = getattr(self.local, "body", None)
+        self.local.body = None
+        return body
+
+class CapturingTransport(Transport):
+    """Transport that passes every SOAP response body to the capture of the call that sent it."""
+
+    def post(self, address, message, headers):
+        capture = getattr(_calling, "capture", None)
+        _calling.capture = None
+        response = super().post(address, message, headers)
+        if capture is not None:
+            capture.received(response.content)
+        return response
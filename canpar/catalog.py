@@ -0,0 +1,182 @@
+import os
+import csv
+import sqlite3
+import threading
+import functools
+from collections import Counter
+
+from canpar import REPO_ROOT
+from canpar.config import get_config
+
+# ==============================================================================
+# --- CONFIGURATION ---
+# ==============================================================================
+# CSV catalogs need a header row with these columns; SQLite catalogs need a
+# `sku_catalog` table with the same column names.
+CATALOG_COLUMNS = ("sku", "weight_lbs", "length", "width", "height")
+SQLITE_TABLE = "sku_catalog"
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+MAX_LISTED_BAD_ROWS = 10
+
+# ==============================================================================
+# --- ORDER LINE EXTRACTION ---
+# ==============================================================================
+def csv_order_lines(order):
+    """Returns [(offer_sku, product_sku, quantity)] for a Best Buy CSV export row (one line per row)."""
+    return [(order.get("Offer SKU"), order.get("Product SKU"), order.get("Quantity") or 1)]
+
+def api_order_lines(order):
+    """Returns [(offer_sku, product_sku, quantity)] for every line of a Best Buy API order."""
+    return [
+        (line.get("offer_sku"), line.get("product_sku"), line.get("quantity") or 1)
+        for line in order.get("order_lines") or []
+    ]
+
+def _clean_sku(sku):
+    """The SKU as written in the order, minus whitespace and pandas' float suffix."""
+    if sku is None or sku != sku:  # None or NaN
+        return ""
+    sku = str(sku).strip()
+    if sku.endswith(".0") and sku[:-2].isdigit():  # numeric SKUs read back as floats by pandas
+        sku = sku[:-2]
+    return sku
+
+def _normalize_sku(sku):
+    return _clean_sku(sku).upper()
+
+def _parse_row(row):
+    """Returns (sku, entry) for a catalog row; entry is None if a field is missing, non-numeric or not positive."""
+    sku = _normalize_sku(row.get("sku"))
+    try:
+        entry = {column: float(row.get(column)) for column in CATALOG_COLUMNS[1:]}
+    except (TypeError, ValueError):
+        return sku, None
+    if not sku or min(entry.values()) <= 0 or any(value != value for value in entry.values()):
+        return sku, None
+    return sku, entry
+
+# ==============================================================================
+# --- CATALOG ---
+# ==============================================================================
+class SkuCatalog:
+    """
+    Per-SKU unit weight and box dimensions, indexed in memory by SKU.
+
+    The catalog file is only read on the first lookup. Lookups are a single dict
+    access, so cost per order does not grow with catalog size. Unknown SKUs are
+    counted so the hit rate can be reported at the end of a run.
+    """
+
+    def __init__(self, path, defaults):
+        self.path = path
+        self.defaults = defaults
+        self.index = None
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.unknown = Counter()
+
+    def load(self):
+        """Builds the SKU index if it has not been built yet. Safe to call from several threads."""
+        if self.index is not None:
+            return self.index
+        with self.lock:
+            if self.index is None:
+                index = {}
+                if not self.path or not os.path.exists(self.path):
+                    print(f"WARNING: SKU catalog not found at {self.path}. Using default package for every SKU.")
+                else:
+                    bad_rows = 0
+                    for location, row in self._read_rows():
+                        sku, entry = _parse_row(row)
+                        if entry is None:
+                            bad_rows += 1
+                            if bad_rows <= MAX_LISTED_BAD_ROWS:
+                                print(f"WARNING: Skipping SKU catalog {location} (SKU {sku or '<blank>'}): "
+                                      f"sku must be set and weight_lbs, length, width, height positive numbers.")
+                            continue
+                        index[sku] = entry
+                    print(f"INFO: Loaded {len(index)} SKUs from catalog {self.path}."
+                          + (f" Skipped {bad_rows} invalid rows; those SKUs use the default package." if bad_rows else ""))
+                self.index = index
+        return self.index
+
+    def _read_rows(self):
+        if self.path.lower().endswith(SQLITE_EXTENSIONS):
+            connection = sqlite3.connect(self.path)
+            try:
+                query = f"SELECT {', '.join(CATALOG_COLUMNS)} FROM {SQLITE_TABLE}"
+                for number, values in enumerate(connection.execute(query), start=1):
+                    yield f"row {number}", dict(zip(CATALOG_COLUMNS, values))
+            finally:
+                connection.close()
+        else:
+            with open(self.path, 'r', newline='', encoding='utf-8-sig') as f:
+                reader = csv.DictReader(f)
+                for row in reader:
+                    yield f"line {reader.line_num}", row
+
+    def lookup(self, offer_sku, product_sku=None):
+        """Returns the catalog entry for the offer SKU, falling back to the product SKU, or None."""
+        index = self.load()
+        for sku in (offer_sku, product_sku):
+            entry = index.get(_normalize_sku(sku))
+            if entry is not None:
+                with self.lock:
+                    self.hits += 1
+                return entry
+        with self.lock:
+            self.unknown[_clean_sku(offer_sku) or _clean_sku(product_sku) or "<blank>"] += 1
+        return None
+
+    def package_for(self, lines):
+        """
+        Computes one package's weight and dimensions for a list of (offer_sku, product_sku, quantity).
+
+        Units are stacked on top of each other: weight and height add up, length
+        and width take the largest box. A unit of an unknown SKU counts as one
+        default package, whether or not the order has known SKUs too.
+        """
+        default = {"weight_lbs": self.defaults.weight_lbs, "length": self.defaults.length,
+                   "width": self.defaults.width, "height": self.defaults.height}
+        if not lines:
+            return dict(default, source="default")
+        package = {"weight_lbs": 0.0, "length": 0.0, "width": 0.0, "height": 0.0}
+        known = False
+        for offer_sku, product_sku, quantity in lines:
+            entry = self.lookup(offer_sku, product_sku)
+            known = known or entry is not None
+            entry = entry or default
+            quantity = max(1, int(float(quantity or 1)))
+            package["weight_lbs"] += entry["weight_lbs"] * quantity
+            package["height"] += entry["height"] * quantity
+            package["length"] = max(package["length"], entry["length"])
+            package["width"] = max(package["width"], entry["width"])
+        return dict(package, weight_lbs=round(package["weight_lbs"], 2), source="catalog" if known else "default")
+
+    def stats(self):
+        with self.lock:
+            misses = sum(self.unknown.values())
+            total = self.hits + misses
+            return {
+                "lookups": total, "hits": self.hits, "misses": misses,
+                "unknown_rate": misses / total if total else 0.0,
+                "top_unknown_skus": self.unknown.most_common(10),
+            }
+
+    def print_report(self):
+        stats = self.stats()
+        if not stats["lookups"]:
+            return
+        print(f"SKU catalog: {stats['hits']}/{stats['lookups']} lookups matched, "
+              f"{stats['unknown_rate']:.1%} fell back to the default package.")
+        for sku, count in stats["top_unknown_skus"]:
+            print(f"   Unknown SKU {sku}: {count} line(s)")
+
+@functools.lru_cache(maxsize=None)
+def get_catalog():
+    """Returns the process-wide SKU catalog configured in the shared config."""
+    config = get_config()
+    path = config.catalog.path
+    if path and not os.path.isabs(path):
+        path = os.path.join(REPO_ROOT, path)
+    return SkuCatalog(path, config.package)
@@ -0,0 +1,121 @@
+import os
+import threading
+import functools
+
+from canpar import REPO_ROOT
+from canpar.config import get_config
+
+# ==============================================================================
+# --- CONFIGURATION ---
+# ==============================================================================
+WSDL_CACHE_TIMEOUT_S = 24 * 3600  # re-download the WSDL/XSDs at most once a day
+WSDL_LOCK = threading.Lock()
+
+# ==============================================================================
+# --- SHARED TRANSPORT ---
+# ==============================================================================
+def connection_pool_size(config):
+    """Enough pooled connections for every worker that can call Canpar at the same time."""
+    account_workers = sum(int(account.get("max_workers", config.runtime.max_workers))
+                          for account in config.accounts.values())
+    return max(account_workers or config.runtime.max_workers, config.tracking.max_workers, 1)
+
+@functools.lru_cache(maxsize=None)
+def get_transport():
+    """
+    Returns the process-wide zeep transport.
+
+    One keep-alive `requests.Session` is shared by every client, with a
+    connection pool sized for all workers, so connections are reused across
+    calls and threads instead of being opened per client. WSDL and XSD
+    downloads go through zeep's cache (SQLite on disk when [canpar]
+    wsdl_cache is set, otherwise in memory). Response bodies are handed to
+    each client's `ResponseCapture` (see canpar/capture.py).
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from zeep.cache import InMemoryCache, SqliteCache
+
+    config = get_config()
+    pool_size = connection_pool_size(config)
+    session = requests.Session()
+    session.verify = True
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    cache_path = config.canpar.wsdl_cache
+    if cache_path:
+        cache_path = cache_path if os.path.isabs(cache_path) else os.path.join(REPO_ROOT, cache_path)
+        cache = SqliteCache(path=cache_path, timeout=WSDL_CACHE_TIMEOUT_S)
+    else:
+        cache = InMemoryCache(timeout=WSDL_CACHE_TIMEOUT_S)
+    from canpar.capture import CapturingTransport
+    return CapturingTransport(session=session, timeout=config.canpar.timeout, cache=cache)
+
+@functools.lru_cache(maxsize=None)
+def get_settings():
+    from zeep import Settings
+    return Settings(strict=False, xml_huge_tree=True)
+
+_documents = {}
+
+def get_wsdl_document(wsdl_url):
+    """Parses a WSDL once per process; every client for that URL shares the parsed document."""
+    document = _documents.get(wsdl_url)
+    if document is None:
+        with WSDL_LOCK:
+            document = _documents.get(wsdl_url)
+            if document is None:
+                from zeep.wsdl import Document
+                document = _documents[wsdl_url] = Document(wsdl_url, get_transport(), settings=get_settings())
+    return document
+
+# ==============================================================================
+# --- CLIENTS ---
+# ==============================================================================
+def create_client(wsdl_url=None, plugins=()):
+    """
+    Builds a (client, capture) pair on the shared transport and parsed WSDL.
+
+    Clients are cheap once the WSDL has been parsed, so each worker can have
+    its own client without paying for setup again. `capture` holds the raw
+    response to each thread's last call until `save_xml_response` takes it.
+    """
+    from zeep import Client
+    from canpar.capture import ResponseCapture
+
+    wsdl_url = wsdl_url or get_config().canpar.wsdl_url
+    capture = ResponseCapture()
+    try:
+        client = Client(get_wsdl_document(wsdl_url), transport=get_transport(), settings=get_settings(),
+                        plugins=[capture, *plugins])
+    except Exception as e:
+        raise RuntimeError(f"Failed to initialize Canpar SOAP client: {e}")
+    return client, capture
+
+def client_factory(plugins):
+    """Client factory for the per-account pools (see canpar.accounts.ClientPool)."""
+    return create_client(plugins=plugins)
+
+def save_xml_response(capture, xml_dir, order_id, request_type):
+    """
+    Saves the raw XML of the response to this thread's last call. Returns the path, or None.
+
+    The body is taken from the capture (and released) even when `xml_dir` is None.
+    """
+    body = capture.take() if capture else None
+    if not xml_dir:
+        return None
+    if body is None:
+        print(f"WARNING: No XML response to save for {order_id} ({request_type}).")
+        return None
+    try:
+        xml_path = os.path.join(xml_dir, f"{order_id}_{request_type}_response.xml")
+        with open(xml_path, 'wb') as f:
+            f.write(body)
+        print(f"INFO: Saved XML response to: {xml_path}")
+        return xml_path
+    except Exception as e:
+        print(f"CRITICAL: Could not save XML response for {order_id}. Error: {e}")
+        return None
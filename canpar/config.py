@@ -0,0 +1,371 @@
+import os
+import json
+import functools
+from dataclasses import dataclass, field
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11
+    import tomli as tomllib
+
+from canpar import REPO_ROOT
+from canpar.accounts import DEFAULT_ACCOUNT_NAME, parse_accounts
+
+# ==============================================================================
+# --- CONFIGURATION SOURCES ---
+# ==============================================================================
+# Precedence: built-in defaults < config file (TOML, YAML or JSON) < environment.
+# Secrets are never read from the file, only from the environment variables it names.
+CONFIG_FILE_ENV = "CANPAR_CONFIG_FILE"
+DEFAULT_CONFIG_FILE = os.path.join(REPO_ROOT, "canpar.toml")
+
+ENV_OVERRIDES = {
+    "CANPAR_ENVIRONMENT": ("canpar", "environment"),
+    "CANPAR_WSDL_URL": ("canpar", "wsdl_url"),
+    "CANPAR_TIMEOUT": ("canpar", "timeout"),
+    "CANPAR_SHIPPER_NUM": ("canpar", "shipper_num"),
+    "CANPAR_MAX_WORKERS": ("runtime", "max_workers"),
+    "CANPAR_MAX_CALLS_PER_SECOND": ("runtime", "max_calls_per_second"),
+    "CANPAR_BATCH_SIZE": ("runtime", "batch_size"),
+    "CANPAR_SCHEDULE": ("runtime", "schedule"),
+    "CANPAR_BURST": ("runtime", "burst"),
+    "CANPAR_ADAPTIVE": ("runtime", "adaptive"),
+    "CANPAR_SKU_CATALOG": ("catalog", "path"),
+    "CANPAR_SUMMARY_FORMAT": ("summary", "format"),
+    "CANPAR_SUMMARY_XLSX": ("summary", "xlsx"),
+    "CANPAR_TRACKING_WSDL_URL": ("tracking", "wsdl_url"),
+    "CANPAR_TRACKING_DB": ("tracking", "db_path"),
+    "CANPAR_TRACKING_MAX_WORKERS": ("tracking", "max_workers"),
+    "CANPAR_RETRY_MAX_ATTEMPTS": ("retry", "max_attempts"),
+    "CANPAR_AUDIT_DIR": ("audit", "dir"),
+    "CANPAR_AUDIT_ENABLED": ("audit", "enabled"),
+    "CANPAR_COST_PER_SHIPMENT": ("dry_run", "cost_per_shipment"),
+}
+
+DEFAULTS = {
+    "canpar": {
+        "environment": "production",
+        "endpoints": {
+            "production": "https://canship.canpar.com/canshipws/services/CanshipBusinessService?wsdl",
+            "stub": "http://127.0.0.1:8765/canshipws/services/CanshipBusinessService?wsdl",
+        },
+        "wsdl_url": "",
+        "wsdl_cache": "wsdl_cache.sqlite",
+        "timeout": 60,
+        "shipper_num": "46000041",
+        "user_env": "CANPAR_API_USER",
+        "password_env": "CANPAR_API_PASSWORD",
+        "service_type": "1",
+        "signature_required": True,
+    },
+    "pickup_address": {
+        "name": "VISIONVATION INC.", "address_line_1": "133 ROCK FERN WAY", "city": "NORTH YORK",
+        "province": "ON", "postal_code": "M2J4N3", "country": "CA", "phone": "6474440848",
+    },
+    "package": {"weight_lbs": 3.0, "length": 16, "width": 12, "height": 3},
+    "catalog": {"path": "sku_catalog.csv"},
+    "summary": {"format": "auto", "xlsx": False},
+    "tracking": {
+        "wsdl_url": "", "db_path": "tracking.sqlite", "max_workers": 4, "poll_interval_minutes": 60,
+        "max_interval_hours": 24, "stale_after_hours": 72, "give_up_after_days": 30,
+    },
+    "retry": {"max_attempts": 6, "backoff_seconds": 60.0, "max_backoff_minutes": 60.0},
+    "audit": {"dir": "audit", "enabled": True},
+    "runtime": {"max_workers": 1, "max_calls_per_second": 0.0, "burst": 1, "adaptive": True, "batch_size": 0,
+                "schedule": "deadline"},
+    "dry_run": {"cost_per_shipment": 0.0, "default_call_ms": 1000.0},
+}
+
+# Keys of Canpar's Address type, and the ones a pickup address cannot do without.
+ADDRESS_FIELDS = ("address_id", "address_line_1", "address_line_2", "address_line_3", "attention", "city",
+                  "country", "email", "extension", "name", "phone", "postal_code", "province", "residential")
+REQUIRED_ADDRESS_FIELDS = ("name", "address_line_1", "city", "province", "postal_code")
+# Keys an [accounts.<name>] table may set, with their types and lowest allowed value.
+ACCOUNT_FIELDS = {
+    "user_env": (str, None), "password_env": (str, None), "shipper_num": (str, None), "pickup_address": (dict, None),
+    "max_workers": (int, 1), "max_calls_per_second": (float, 0), "burst": (int, 1), "adaptive": (bool, None),
+}
+
+class ConfigError(ValueError):
+    """Raised when the configuration is invalid or a required secret is missing."""
+
+# ==============================================================================
+# --- TYPED CONFIGURATION ---
+# ==============================================================================
+@dataclass(frozen=True)
+class CanparSettings:
+    environment: str
+    wsdl_url: str
+    wsdl_cache: str
+    timeout: int
+    shipper_num: str
+    user_env: str
+    password_env: str
+    service_type: str
+    signature_required: bool
+
+@dataclass(frozen=True)
+class PackageDefaults:
+    weight_lbs: float
+    length: int
+    width: int
+    height: int
+
+@dataclass(frozen=True)
+class CatalogSettings:
+    path: str
+
+@dataclass(frozen=True)
+class SummarySettings:
+    format: str
+    xlsx: bool
+
+@dataclass(frozen=True)
+class TrackingSettings:
+    wsdl_url: str
+    db_path: str
+    max_workers: int
+    poll_interval_minutes: float
+    max_interval_hours: float
+    stale_after_hours: float
+    give_up_after_days: float
+
+@dataclass(frozen=True)
+class RetrySettings:
+    max_attempts: int
+    backoff_seconds: float
+    max_backoff_minutes: float
+
+@dataclass(frozen=True)
+class AuditSettings:
+    dir: str
+    enabled: bool
+
+@dataclass(frozen=True)
+class RuntimeSettings:
+    max_workers: int
+    max_calls_per_second: float
+    burst: int
+    adaptive: bool
+    batch_size: int
+    schedule: str
+
+@dataclass(frozen=True)
+class DryRunSettings:
+    cost_per_shipment: float
+    default_call_ms: float
+
+@dataclass(frozen=True)
+class Config:
+    canpar: CanparSettings
+    package: PackageDefaults
+    catalog: CatalogSettings
+    summary: SummarySettings
+    tracking: TrackingSettings
+    retry: RetrySettings
+    audit: AuditSettings
+    runtime: RuntimeSettings
+    dry_run: DryRunSettings
+    pickup_address: dict
+    accounts: dict = field(default_factory=dict)
+    routes: list = field(default_factory=list)
+    default_account: str = ""
+    source: str = ""
+
+# ==============================================================================
+# --- LOADING ---
+# ==============================================================================
+@functools.lru_cache(maxsize=None)
+def get_config(path=None):
+    """Loads, validates and caches the configuration shared by every entry point."""
+    path = path or os.environ.get(CONFIG_FILE_ENV) or DEFAULT_CONFIG_FILE
+    raw = _merge(DEFAULTS, read_config_file(path))
+    for env_name, (section, key) in ENV_OVERRIDES.items():
+        if os.environ.get(env_name):
+            raw[section][key] = os.environ[env_name]
+    return build_config(raw, source=path if os.path.exists(path) else "<defaults>")
+
+@functools.lru_cache(maxsize=None)
+def get_accounts(path=None):
+    """Resolves shipper accounts, pulling their credentials from the environment."""
+    config = get_config(path)
+    accounts = config.accounts or {DEFAULT_ACCOUNT_NAME: {}}
+    resolved = {}
+    missing = []
+    for name, account in accounts.items():
+        account = dict(account)
+        for secret, default_env in (("user", config.canpar.user_env), ("password", config.canpar.password_env)):
+            env_name = account.pop(f"{secret}_env", default_env)
+            account[secret] = os.environ.get(env_name)
+            if not account[secret]:
+                missing.append(env_name)
+        account.setdefault("shipper_num", config.canpar.shipper_num)
+        account.setdefault("pickup_address", config.pickup_address)
+        account.setdefault("max_workers", config.runtime.max_workers)
+        account.setdefault("max_calls_per_second", config.runtime.max_calls_per_second)
+        account.setdefault("burst", config.runtime.burst)
+        account.setdefault("adaptive", config.runtime.adaptive)
+        resolved[name] = account
+    if missing:
+        raise ConfigError(f"Missing secrets in environment: {', '.join(sorted(set(missing)))}")
+    try:
+        return parse_accounts(
+            {"accounts": resolved, "routes": config.routes, "default_account": config.default_account},
+            source=config.source,
+        )
+    except ValueError as e:
+        raise ConfigError(str(e))
+
+def read_config_file(path):
+    """Parses a TOML, YAML or JSON config file. A missing file means "use defaults"."""
+    if not os.path.exists(path):
+        return {}
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        if ext in (".yaml", ".yml"):
+            import yaml
+            with open(path, 'r') as f:
+                return yaml.safe_load(f) or {}
+        if ext == ".json":
+            with open(path, 'r') as f:
+                return json.load(f)
+        with open(path, 'rb') as f:
+            return tomllib.load(f)
+    except ImportError:
+        raise ConfigError(f"PyYAML is required to read {path}")
+    except Exception as e:
+        raise ConfigError(f"Could not parse config file {path}: {e}")
+
+def build_config(raw, source=""):
+    """Coerces and validates a merged raw config dict into a `Config`."""
+    errors = []
+    canpar = dict(raw["canpar"])
+    endpoints = canpar.pop("endpoints")
+    if not canpar["wsdl_url"]:
+        if canpar["environment"] not in endpoints:
+            errors.append(f"canpar.environment '{canpar['environment']}' has no entry in canpar.endpoints")
+        canpar["wsdl_url"] = endpoints.get(canpar["environment"], "")
+    tracking = dict(raw["tracking"])
+    if not tracking["wsdl_url"]:
+        # Tracking lives in Canpar's add-ons service, next to the shipping service.
+        tracking["wsdl_url"] = canpar["wsdl_url"].replace("CanshipBusinessService", "CanparAddonsService")
+
+    sections = {
+        "canpar": _coerce(CanparSettings, canpar, "canpar", errors),
+        "package": _coerce(PackageDefaults, raw["package"], "package", errors),
+        "catalog": _coerce(CatalogSettings, raw["catalog"], "catalog", errors),
+        "summary": _coerce(SummarySettings, raw["summary"], "summary", errors),
+        "tracking": _coerce(TrackingSettings, tracking, "tracking", errors),
+        "retry": _coerce(RetrySettings, raw["retry"], "retry", errors),
+        "audit": _coerce(AuditSettings, raw["audit"], "audit", errors),
+        "runtime": _coerce(RuntimeSettings, raw["runtime"], "runtime", errors),
+        "dry_run": _coerce(DryRunSettings, raw["dry_run"], "dry_run", errors),
+    }
+    _check_address(raw["pickup_address"], "pickup_address", errors)
+    for name, account in (raw.get("accounts") or {}).items():
+        _check_account(account, f"accounts.{name}", errors)
+    if not errors:
+        if sections["runtime"].max_workers < 1:
+            errors.append("runtime.max_workers must be at least 1")
+        if sections["summary"].format not in ("auto", "parquet", "csv"):
+            errors.append("summary.format must be one of auto, parquet, csv")
+        if sections["tracking"].max_workers < 1:
+            errors.append("tracking.max_workers must be at least 1")
+        if min(sections["tracking"].poll_interval_minutes, sections["tracking"].max_interval_hours) <= 0:
+            errors.append("tracking poll intervals must be positive")
+        if sections["runtime"].burst < 1:
+            errors.append("runtime.burst must be at least 1")
+        if sections["retry"].max_attempts < 1:
+            errors.append("retry.max_attempts must be at least 1")
+        if min(sections["retry"].backoff_seconds, sections["retry"].max_backoff_minutes) <= 0:
+            errors.append("retry backoff delays must be positive")
+        if sections["runtime"].batch_size < 0:
+            errors.append("runtime.batch_size must be 0 (no batching) or positive")
+        if sections["runtime"].schedule not in ("deadline", "file"):
+            errors.append("runtime.schedule must be one of deadline, file")
+        if sections["dry_run"].cost_per_shipment < 0 or sections["dry_run"].default_call_ms <= 0:
+            errors.append("dry_run.cost_per_shipment must not be negative and dry_run.default_call_ms must be positive")
+        if min(sections["package"].weight_lbs, sections["package"].length, sections["package"].width, sections["package"].height) <= 0:
+            errors.append("package weight and dimensions must be positive")
+    if errors:
+        raise ConfigError("Invalid configuration ({}):\n  - {}".format(source, "\n  - ".join(errors)))
+
+    return Config(
+        pickup_address=dict(raw["pickup_address"]),
+        accounts=raw.get("accounts", {}),
+        routes=raw.get("routes", []),
+        default_account=raw.get("default_account", ""),
+        source=source,
+        **sections
+    )
+
+def _coerce(cls, values, section, errors):
+    """Builds a settings dataclass, converting env-var strings to the declared field types."""
+    kwargs = {}
+    for name, f in cls.__dataclass_fields__.items():
+        if name not in values:
+            errors.append(f"{section}.{name} is required")
+            continue
+        value = values[name]
+        try:
+            if f.type in (bool, "bool") and isinstance(value, str):
+                value = value.strip().lower() in ("1", "true", "yes", "on")
+            elif f.type in (int, "int"):
+                value = int(value)
+            elif f.type in (float, "float"):
+                value = float(value)
+            elif f.type in (str, "str"):
+                value = str(value)
+        except (TypeError, ValueError):
+            errors.append(f"{section}.{name} must be {getattr(f.type, '__name__', f.type)}, got {value!r}")
+            continue
+        kwargs[name] = value
+    unknown = set(values) - set(cls.__dataclass_fields__)
+    for name in sorted(unknown):
+        errors.append(f"{section}.{name} is not a known setting")
+    return cls(**kwargs) if len(kwargs) == len(cls.__dataclass_fields__) else None
+
+def _check_address(address, section, errors):
+    """Checks an address table before it is passed to the Canpar Address type."""
+    if not isinstance(address, dict):
+        errors.append(f"{section} must be a table")
+        return
+    for key in sorted(set(address) - set(ADDRESS_FIELDS)):
+        errors.append(f"{section}.{key} is not a Canpar address field")
+    for key in REQUIRED_ADDRESS_FIELDS:
+        if not address.get(key):
+            errors.append(f"{section}.{key} is required")
+
+def _check_account(account, section, errors):
+    """Checks an [accounts.<name>] table: known keys only, each of the right type and range."""
+    if not isinstance(account, dict):
+        errors.append(f"{section} must be a table")
+        return
+    for key in sorted(set(account) - set(ACCOUNT_FIELDS)):
+        errors.append(f"{section}.{key} is not a known account setting")
+    for key, (kind, minimum) in ACCOUNT_FIELDS.items():
+        if key not in account:
+            continue
+        value = account[key]
+        if kind is float:
+            valid = isinstance(value, (int, float)) and not isinstance(value, bool)
+        elif kind is int:
+            valid = isinstance(value, int) and not isinstance(value, bool)
+        else:
+            valid = isinstance(value, kind)
+        if not valid:
+            errors.append(f"{section}.{key} must be {kind.__name__}, got {value!r}")
+        elif minimum is not None and value < minimum:
+            errors.append(f"{section}.{key} must be at least {minimum}, got {value!r}")
+    if isinstance(account.get("pickup_address"), dict):
+        _check_address(account["pickup_address"], f"{section}.pickup_address", errors)
+
+def _merge(base, override):
+    """Recursively merges two config dicts without mutating either."""
+    merged = {}
+    for key in list(base) + [k for k in override if k not in base]:
+        if isinstance(base.get(key), dict) and isinstance(override.get(key), dict):
+            merged[key] = _merge(base[key], override[key])
+        else:
+            merged[key] = override[key] if key in override else base[key]
+    return merged
@@ -0,0 +1,212 @@
+import os
+from datetime import datetime
+
+import pandas as pd
+from zeep.exceptions import Fault
+
+from canpar.accounts import csv_routing_keys, run_sharded
+from canpar.audit import get_audit_log, audited_fields
+from canpar.config import get_config, get_accounts, ConfigError
+from canpar.catalog import get_catalog, csv_order_lines
+from canpar.client import client_factory, save_xml_response
+from canpar.labels import get_canpar_label
+from canpar.results import open_results_sink
+from canpar.scheduling import SlaReport, csv_deadline, deadline_priority
+
+# ==============================================================================
+# --- CONFIGURATION ---
+# ==============================================================================
+# Shipping path for the Best Buy order export (orders.csv), used by
+# 0. BB_to_Canpar.py and 0.canpar_ubuntu.py. Paths are relative to the
+# directory the script is run from.
+INPUT_FILE = "orders.csv"
+OUTPUT_DIR = "."
+SUMMARY_NAME = "Canpar_Shipment_Summary"  # extension depends on [summary] format
+
+# ==============================================================================
+# --- ORDERS ---
+# ==============================================================================
+def load_orders(input_file):
+    """Reads the Best Buy order export and normalizes the numeric columns."""
+    df = pd.read_csv(input_file, encoding="utf-8-sig")
+    df['Quantity'] = pd.to_numeric(df['Quantity'], errors='coerce').fillna(1)
+    df['Total order amount incl. VAT (including shipping charges)'] = pd.to_numeric(
+        df['Total order amount incl. VAT (including shipping charges)'], errors='coerce'
+    ).fillna(0.0)
+    return df
+
+def build_shipment_request(client, order_data, account):
+    """Builds the ProcessShipmentRq for one order row."""
+    config = get_config()
+    order_id = str(order_data["Order number"])
+    request_factory = client.type_factory('ns1')
+    data_factory = client.type_factory('ns2')
+
+    pickup_addr = data_factory.Address(**account['pickup_address'])
+    delivery_addr = data_factory.Address(
+        name=f"{order_data['Shipping address first name']} {order_data['Shipping address last name']}",
+        address_line_1=order_data['Shipping address street 1'], address_line_2=order_data.get('Shipping address street 2', ''),
+        city=order_data['Shipping address city'], province=order_data['Shipping address state'],
+        postal_code=order_data['Shipping address zip'], country='CA', phone=str(order_data.get('Shipping address phone', '')),
+        email=order_data.get('Shipping address email', '')
+    )
+    package_dims = get_catalog().package_for(csv_order_lines(order_data))
+    package = data_factory.Package(
+        reported_weight=package_dims['weight_lbs'], length=package_dims['length'], width=package_dims['width'],
+        height=package_dims['height'], declared_value=float(order_data['Total order amount incl. VAT (including shipping charges)'])
+    )
+    shipment = data_factory.Shipment(
+        shipper_num=account['shipper_num'], shipping_date=datetime.now(), service_type=config.canpar.service_type,
+        pickup_address=pickup_addr, delivery_address=delivery_addr, packages=[package], order_id=order_id,
+        dimention_unit='I', reported_weight_unit='L', nsr=not config.canpar.signature_required,
+        description=f"{int(order_data['Quantity'])}x {order_data['Offer SKU']}"
+    )
+    return request_factory.ProcessShipmentRq(
+        user_id=account['user'], password=account['password'], shipment=shipment
+    )
+
+# ==============================================================================
+# --- CANPAR CALLS ---
+# ==============================================================================
+def create_canpar_shipment(client, capture, order_data, account, xml_dir=None):
+    """Constructs and sends the SOAP request to create a shipment."""
+    order_id = str(order_data["Order number"])
+    print(f"\n--- Processing Order: {order_id} ---")
+
+    try:
+        request_data = build_shipment_request(client, order_data, account)
+        response = client.service.processShipment(request=request_data)
+        xml_path = save_xml_response(capture, xml_dir, order_id, "shipment")
+
+        if response and response.error is None:
+            shipment_id = response.processShipmentResult.shipment.id
+            tracking_num = response.processShipmentResult.shipment.packages[0].barcode
+            print(f"✅ Shipment Created! ID: {shipment_id}, Tracking: {tracking_num}")
+            return {"status": "SUCCESS", "shipment_id": shipment_id, "tracking_num": tracking_num, "xml_path": xml_path}
+        else:
+            error_msg = response.error if response else "Empty response"
+            print(f"❌ API Failed for Order {order_id}. Error: {error_msg}")
+            return {"status": "FAILED", "error": str(error_msg), "xml_path": xml_path}
+
+    except Fault as f:
+        xml_path = save_xml_response(capture, xml_dir, order_id, "shipment_fault")
+        print(f"❌ SOAP Fault occurred for Order {order_id}: {f.message}")
+        return {"status": "SOAP_FAULT", "error": f.message, "xml_path": xml_path}
+    except Exception as e:
+        print(f"❌ An unexpected error occurred for Order {order_id}: {e}")
+        return {"status": "EXCEPTION", "error": str(e)}
+
+# ==============================================================================
+# --- MAIN WORKFLOW ---
+# ==============================================================================
+def process_orders(input_file=INPUT_FILE, output_dir=OUTPUT_DIR, save_xml=True, dry_run=False, rate=False):
+    """
+    Loads the order export, creates shipments and labels, and streams the summary.
+
+    With `dry_run`, only checks the orders and projects the run (see
+    canpar/dry_run.py); nothing is shipped or written. `rate` adds a
+    rateShipment quote per order to the dry run.
+    """
+    if not os.path.exists(input_file):
+        print(f"Input file not found: {input_file}")
+        return 1
+
+    try:
+        accounts_cfg = get_accounts()
+    except ConfigError as e:
+        print(f"Configuration error: {e}")
+        return 1
+
+    if dry_run:
+        from canpar.dry_run import dry_run_orders
+        try:
+            orders = [row.to_dict() for _, row in load_orders(input_file).iterrows()]
+            print(f"Loaded {len(orders)} orders for a dry run.")
+            dry_run_orders(orders, accounts_cfg, csv_routing_keys, build_shipment_request,
+                           lambda order: str(order["Order number"]),
+                           lambda order: (order.get('Shipping address first name'), order.get('Shipping address last name')),
+                           rate=rate)
+        except Exception as e:
+            print(f"\nFATAL ERROR during dry run: {str(e)}")
+            return 1
+        return
+
+    labels_dir = os.path.join(output_dir, "labels")
+    xml_dir = os.path.join(output_dir, "xml_responses") if save_xml else None
+    for dir_path in filter(None, [labels_dir, xml_dir]):
+        if not os.path.exists(dir_path):
+            os.makedirs(dir_path, exist_ok=True)
+            print(f"Created output directory: {dir_path}")
+
+    try:
+        df = load_orders(input_file)
+        print(f"Loaded {len(df)} orders for processing.")
+        summary_sink = open_results_sink(os.path.join(output_dir, SUMMARY_NAME))
+        audit = get_audit_log()
+        sla = SlaReport()
+
+        def process_order(account, canpar_client, capture, order):
+            order_number = str(order["Order number"])
+            context = {"source": "csv", "sku": str(order["Offer SKU"]), "account": account["name"]}
+
+            with audit.stage(order_number, "order", **context) as order_event:
+                with audit.stage(order_number, "shipment", **context) as event:
+                    shipment_result = create_canpar_shipment(canpar_client, capture, order, account, xml_dir)
+                    event.update(audited_fields(shipment_result, "status", "shipment_id", "error", "xml_path"),
+                                 tracking_number=shipment_result.get("tracking_num"))
+
+                tracking_num = "N/A"
+                label_status = "FAILED"
+                error_details = shipment_result.get('error', 'None')
+
+                if shipment_result["status"] == "SUCCESS":
+                    tracking_num = shipment_result["tracking_num"]
+                    with audit.stage(order_number, "label", tracking_number=tracking_num, **context) as event:
+                        label_result = get_canpar_label(canpar_client, capture, shipment_result["shipment_id"], order_number,
+                                                        account, labels_dir, xml_dir)
+                        event.update(audited_fields(label_result, "status", "error", "label_path", "xml_path", "failed_path"))
+                    if label_result["status"] == "SUCCESS":
+                        label_status = "SUCCESS"
+                    else:
+                        error_details = label_result.get('error', 'None')
+
+                deadline = csv_deadline(order)
+                on_time = sla.record(order_number, deadline, label_status == "SUCCESS")
+                order_event.update(status="SHIPPED" if label_status == "SUCCESS" else "FAILED",
+                                   tracking_number=None if tracking_num == "N/A" else tracking_num,
+                                   error=None if label_status == "SUCCESS" else error_details, summary_path=summary_sink.path,
+                                   deadline=deadline.isoformat() if deadline else None, on_time=on_time)
+
+            order_record = {
+                "Order number": order_number, "Customer Name": f"{order['Shipping address first name']} {order['Shipping address last name']}",
+                "SKU": order["Offer SKU"], "Quantity": order["Quantity"], "Account": account["name"], "Tracking Number": tracking_num,
+                "Shipment API Status": shipment_result.get('status'), "Label API Status": label_status,
+                "Error Details": error_details, "Timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            }
+            summary_sink.write(order_record)
+            return order_record
+
+        get_catalog().load()  # once, before the workers share it
+        orders = [row.to_dict() for _, row in df.iterrows()]
+        runtime = get_config().runtime
+        sla.plan(orders, csv_deadline, runtime.schedule == "deadline")
+        try:
+            run_sharded(orders, accounts_cfg, csv_routing_keys, client_factory, process_order,
+                        batch_size=runtime.batch_size,
+                        priority=deadline_priority(csv_deadline) if runtime.schedule == "deadline" else None)
+        finally:
+            summary_sink.close()
+
+        print("\n" + "=" * 50)
+        print("Processing Complete. Summary:")
+        print("=" * 50)
+
+        print(f"Summary saved to: {summary_sink.path}")
+        if summary_sink.xlsx_path:
+            print(f"Summary workbook saved to: {summary_sink.xlsx_path}")
+        sla.print_report()
+        get_catalog().print_report()
+
+    except Exception as e:
+        print(f"\nFATAL ERROR during processing: {str(e)}")
+        return 1
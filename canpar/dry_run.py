@@ -0,0 +1,226 @@
+import os
+import re
+from collections import Counter
+
+from canpar.accounts import run_sharded
+from canpar.audit import AuditIndex, resolve_audit_dir
+from canpar.catalog import get_catalog
+from canpar.config import get_config
+from canpar.client import client_factory, create_client
+
+# ==============================================================================
+# --- CONFIGURATION ---
+# ==============================================================================
+# A dry run builds, validates and serializes every processShipment request and
+# optionally quotes it with rateShipment, but never creates a shipment. The
+# projection assumes the two calls a real run makes per valid order
+# (processShipment + getLabels), timed from the audit trail's recent
+# successful shipment and label stages.
+CALLS_PER_ORDER = 2
+LATENCY_STAGES = ("shipment", "label")
+LATENCY_SAMPLE_SIZE = 500  # most recent successful calls per stage
+REQUIRED_ADDRESS_FIELDS = ("name", "address_line_1", "city", "province", "postal_code")
+POSTAL_CODE_PATTERN = re.compile(r'^[A-Z]\d[A-Z] ?\d[A-Z]\d$')
+MAX_LISTED_INVALID = 10
+
+# ==============================================================================
+# --- VALIDATION AND RATING ---
+# ==============================================================================
+def _is_blank(value):
+    return value is None or value != value or str(value).strip() in ("", "nan", "None")  # value != value: NaN
+
+def validate_request(request, name_parts=None):
+    """
+    Returns what is wrong with a built ProcessShipmentRq; an empty list means it can be submitted.
+
+    `name_parts` are the order's own name fields. The request's name is built
+    from them ("nan nan" for a row without a name), so when given they decide
+    whether the delivery name is missing.
+    """
+    problems = []
+    shipment = request.shipment
+    address = shipment.delivery_address
+    for field in REQUIRED_ADDRESS_FIELDS:
+        if field == "name" and name_parts is not None:
+            missing = all(_is_blank(part) for part in name_parts)
+        else:
+            missing = _is_blank(getattr(address, field, None))
+        if missing:
+            problems.append(f"missing delivery {field}")
+    postal_code = str(address.postal_code or "").strip().upper()
+    if postal_code and (address.country or "CA") == "CA" and not POSTAL_CODE_PATTERN.match(postal_code):
+        problems.append(f"invalid postal code {address.postal_code!r}")
+    if any(not package.reported_weight or package.reported_weight <= 0 for package in shipment.packages):
+        problems.append("package weight must be positive")
+    return problems
+
+def rate_request(client, request):
+    """Quotes a built shipment with rateShipment. Returns (total, error)."""
+    rate_rq = client.type_factory('ns1').RateShipmentRq(
+        user_id=request.user_id, password=request.password, shipment=request.shipment,
+        apply_association_discount=True, apply_individual_discount=True, apply_invoice_discount=True
+    )
+    response = client.service.rateShipment(request=rate_rq)
+    if response and response.error is None and response.processShipmentResult:
+        return float(response.processShipmentResult.shipment.total), None
+    return None, str(response.error if response else "Empty or malformed rating response")
+
+# ==============================================================================
+# --- PROJECTION ---
+# ==============================================================================
+def recorded_latencies():
+    """Returns {stage: (median_s, p95_s, samples)} for recent successful shipment/label stages in the audit trail."""
+    directory = resolve_audit_dir()
+    if not get_config().audit.enabled or not os.path.isdir(directory):
+        return {}
+    index = AuditIndex(directory)
+    try:
+        index.sync()
+        latencies = {}
+        for stage in LATENCY_STAGES:
+            durations = sorted(event["duration_ms"] / 1000 for event in
+                               index.query(stage=stage, status="SUCCESS", limit=LATENCY_SAMPLE_SIZE)
+                               if event.get("duration_ms") is not None)
+            if durations:
+                latencies[stage] = (durations[len(durations) // 2],
+                                    durations[min(len(durations) - 1, int(len(durations) * 0.95))], len(durations))
+        return latencies
+    finally:
+        index.close()
+
+def project_wall_time(valid_per_account, accounts_cfg, seconds_per_order):
+    """
+    Seconds a real run would take.
+
+    Accounts run in parallel; each keeps `max_workers` orders in flight and
+    stays under `max_calls_per_second`.
+    """
+    projected = 0.0
+    for name, count in valid_per_account.items():
+        account = accounts_cfg["accounts"][name]
+        seconds = count * seconds_per_order / account["max_workers"]
+        if account["max_calls_per_second"] > 0:
+            seconds = max(seconds, count * CALLS_PER_ORDER / account["max_calls_per_second"])
+        projected = max(projected, seconds)
+    return projected
+
+def _format_duration(seconds):
+    if seconds < 60:
+        return f"{seconds:.1f} s"
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes:02d}m {seconds:02d}s" if hours else f"{minutes}m {seconds:02d}s"
+
+# ==============================================================================
+# --- DRY RUN ---
+# ==============================================================================
+def dry_run_orders(orders, accounts_cfg, routing_keys, build_request, order_id_of, name_parts_of=None, rate=False):
+    """
+    Checks every order as a real run would submit it, without calling processShipment.
+
+    `build_request(client, order, account)` is the workflow's request builder
+    and `name_parts_of(order)` returns the order's delivery name fields.
+    Requests are serialized against the WSDL schema and checked for the fields
+    Canpar needs; with `rate`, each valid one is also quoted with rateShipment.
+    A malformed order is reported as invalid and never stops the run. Prints
+    and returns the report.
+    """
+    from lxml import etree
+    # Requests are serialized by a client of their own: it shares the parsed WSDL
+    # but has no rate-limiter plugin, so no account's limiter slot is taken.
+    serializer, _ = create_client()
+
+    def safe_routing_keys(order):
+        try:
+            return routing_keys(order)
+        except Exception:
+            return "", "", ""  # routed to the default account; check() reports what is wrong
+
+    def check(account, client, capture, order):
+        result = {"order_id": None, "account": account["name"], "valid": False}
+        try:
+            result["order_id"] = order_id_of(order)
+            request = build_request(client, order, account)
+            name_parts = name_parts_of(order) if name_parts_of else None
+            etree.tostring(serializer.create_message(serializer.service, "processShipment", request=request))
+        except Exception as e:
+            result["error"] = f"request could not be built: {e}"
+            return result
+        problems = validate_request(request, name_parts)
+        if problems:
+            result["error"] = "; ".join(problems)
+            return result
+        result["valid"] = True
+        if rate:
+            result["rated"] = True
+            try:
+                result["cost"], error = rate_request(client, request)
+            except Exception as e:
+                result["rating_error"] = str(e)  # says nothing about the order itself
+            else:
+                if error:
+                    result.update(valid=False, error=f"rating rejected the shipment: {error}")
+            finally:
+                capture.take()
+        return result
+
+    get_catalog().load()  # once, before the workers share it
+    results = run_sharded(orders, accounts_cfg, safe_routing_keys, client_factory, check,
+                          batch_size=get_config().runtime.batch_size)
+    report = build_report(results, accounts_cfg, rate)
+    print_report(report)
+    return report
+
+def build_report(results, accounts_cfg, rated):
+    config = get_config()
+    valid = [result for result in results if result["valid"]]
+    latencies = recorded_latencies()
+    default_s = config.dry_run.default_call_ms / 1000
+    median_s = sum(latencies[stage][0] if stage in latencies else default_s for stage in LATENCY_STAGES)
+    p95_s = sum(latencies[stage][1] if stage in latencies else default_s for stage in LATENCY_STAGES)
+    valid_per_account = Counter(result["account"] for result in valid)
+
+    costs = [result["cost"] for result in valid if result.get("cost") is not None]
+    if rated and costs:
+        # Orders whose quote failed are costed at the average quote.
+        cost, cost_basis = sum(costs) * len(valid) / len(costs), f"rateShipment quotes for {len(costs)} orders"
+    elif config.dry_run.cost_per_shipment > 0:
+        cost, cost_basis = len(valid) * config.dry_run.cost_per_shipment, "[dry_run] cost_per_shipment"
+    else:
+        cost, cost_basis = None, "run with --rate or set [dry_run] cost_per_shipment"
+
+    return {
+        "orders": len(results), "valid": len(valid), "invalid": [r for r in results if not r["valid"]],
+        "api_calls": len(valid) * CALLS_PER_ORDER, "rating_calls": sum(1 for r in results if r.get("rated")),
+        "seconds_per_order": median_s, "seconds_per_order_p95": p95_s,
+        "latency_samples": {stage: latencies[stage][2] for stage in latencies},
+        "wall_time_s": project_wall_time(valid_per_account, accounts_cfg, median_s),
+        "wall_time_p95_s": project_wall_time(valid_per_account, accounts_cfg, p95_s),
+        "workers": {name: accounts_cfg["accounts"][name]["max_workers"] for name in valid_per_account},
+        "cost": cost, "cost_basis": cost_basis,
+    }
+
+def print_report(report):
+    print("\n" + "=" * 50)
+    print("Dry run complete. No shipments were created.")
+    print("=" * 50)
+    print(f"Orders: {report['orders']}, valid: {report['valid']}, invalid: {len(report['invalid'])}")
+    for result in report["invalid"][:MAX_LISTED_INVALID]:
+        print(f"   Invalid: order {result['order_id']}: {result['error']}")
+    if len(report["invalid"]) > MAX_LISTED_INVALID:
+        print(f"   ... and {len(report['invalid']) - MAX_LISTED_INVALID} more")
+    print(f"API calls for a real run: {report['api_calls']} ({report['valid']} processShipment + {report['valid']} getLabels)"
+          + (f"; this dry run made {report['rating_calls']} rateShipment calls." if report["rating_calls"] else "."))
+    samples = report["latency_samples"]
+    basis = (f"recorded latency of {sum(samples.values())} recent calls in the audit trail" if samples
+             else "no recorded latency yet, assuming [dry_run] default_call_ms per call")
+    if samples and len(samples) < len(LATENCY_STAGES):
+        basis += ", default_call_ms for the rest"
+    print(f"Time per order: {report['seconds_per_order']:.2f} s median, {report['seconds_per_order_p95']:.2f} s p95 ({basis}).")
+    workers = ", ".join(f"{name}: {count}" for name, count in report["workers"].items()) or "-"
+    print(f"Projected wall time: {_format_duration(report['wall_time_s'])} "
+          f"(p95 latency: {_format_duration(report['wall_time_p95_s'])}) with workers per account {workers}.")
+    if report["cost"] is None:
+        print(f"Estimated cost: not estimated ({report['cost_basis']}).")
+    else:
+        print(f"Estimated cost: ${report['cost']:,.2f} (from {report['cost_basis']}).")
@@ -0,0 +1,86 @@
+import os
+import re
+import time
+import base64
+
+from canpar.client import save_xml_response
+from canpar.ratelimit import BASE_BACKOFF_S
+
+BASE64_PATTERN = re.compile(r'^[A-Za-z0-9+/=\s]+$')
+# getLabels is idempotent, so a call that was throttled (SOAP fault) or lost
+# (transport error) is sent again, waiting the limiter's backoff, doubled per
+# attempt. The limiter itself holds the retry while the account is paused.
+LABEL_ATTEMPTS = 3
+RETRYABLE_LABEL_STATUSES = ("SOAP_FAULT", "EXCEPTION")
+
+def is_base64(s):
+    """Check if a string is a valid Base64 encoded string."""
+    if not isinstance(s, str) or not s:
+        return False
+    return bool(BASE64_PATTERN.match(s))
+
+def write_label_pdf(label_data, label_path):
+    """Decodes a base64 label and writes it as a PDF."""
+    with open(label_path, 'wb') as f:
+        f.write(base64.b64decode(label_data))
+
+def get_canpar_label(client, capture, shipment_id, order_id, account, pdf_dir, xml_dir=None, failed_dir=None,
+                     request_type="label"):
+    """
+    Retrieves the PDF label for a shipment and saves it as `<pdf_dir>/<order_id>.pdf`.
+
+    Returns a result dict whose "status" is SUCCESS, API_ERROR, INVALID_LABEL_DATA,
+    SOAP_FAULT or EXCEPTION. Payloads that are not base64 are kept in
+    `failed_dir` for inspection ("failed_path"); the raw response goes to
+    `xml_dir` when given ("xml_path"). SOAP faults and transport errors are
+    retried up to LABEL_ATTEMPTS times; "attempts" is set when it took more than one.
+    """
+    for attempt in range(1, LABEL_ATTEMPTS + 1):
+        result = _get_canpar_label(client, shipment_id, order_id, account, pdf_dir, failed_dir, request_type)
+        if result["status"] not in RETRYABLE_LABEL_STATUSES or attempt == LABEL_ATTEMPTS:
+            break
+        delay = BASE_BACKOFF_S * 2 ** (attempt - 1)
+        print(f"INFO: Retrying label for {order_id} in {delay:.1f} s (attempt {attempt + 1}/{LABEL_ATTEMPTS}).")
+        time.sleep(delay)
+    if attempt > 1:
+        result["attempts"] = attempt
+    xml_path = save_xml_response(capture, xml_dir, order_id, request_type)
+    if xml_path:
+        result["xml_path"] = xml_path
+    return result
+
+def _get_canpar_label(client, shipment_id, order_id, account, pdf_dir, failed_dir, request_type):
+    from zeep.exceptions import Fault
+
+    print(f"INFO: Retrieving label for shipment ID: {shipment_id}...")
+    try:
+        request_data = client.type_factory('ns1').GetLabelsRq(
+            user_id=account['user'], password=account['password'], id=shipment_id, thermal=False
+        )
+        response = client.service.getLabels(request=request_data)
+
+        if response and response.error is None and response.labels:
+            label_data = response.labels[0]
+            if is_base64(label_data):
+                label_path = os.path.join(pdf_dir, f"{order_id}.pdf")
+                write_label_pdf(label_data, label_path)
+                print(f"SUCCESS: Saved PDF label to: {label_path}")
+                return {"status": "SUCCESS", "label_path": label_path}
+            print(f"ERROR: Label response for {order_id} is not valid Base64.")
+            result = {"status": "INVALID_LABEL_DATA", "error": "Response was not a valid Base64 string."}
+            if failed_dir:
+                result["failed_path"] = os.path.join(failed_dir, f"{order_id}_invalid_{request_type}.txt")
+                with open(result["failed_path"], 'w') as f:
+                    f.write(str(label_data))
+            return result
+
+        error_msg = response.error if response else "Empty or malformed label response"
+        print(f"ERROR: Label retrieval API returned an error for {order_id}: {error_msg}")
+        return {"status": "API_ERROR", "error": str(error_msg)}
+
+    except Fault as f:
+        print(f"ERROR: SOAP Fault during label retrieval for {order_id}: {f.message}")
+        return {"status": "SOAP_FAULT", "error": f.message}
+    except Exception as e:
+        print(f"ERROR: An exception occurred while retrieving label for {order_id}: {e}")
+        return {"status": "EXCEPTION", "error": str(e)}
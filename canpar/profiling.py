@@ -0,0 +1,124 @@
+import os
+import time
+import argparse
+from contextlib import contextmanager
+from datetime import datetime
+
+from canpar import REPO_ROOT
+
+# ==============================================================================
+# --- CONFIGURATION ---
+# ==============================================================================
+PROFILE_ENV = "CANPAR_PROFILE"
+PROFILE_MODES = ("cprofile", "pyinstrument")
+PROFILES_DIR = os.path.join(REPO_ROOT, "profiles")
+PROFILE_TOP_N = 25
+
+# ==============================================================================
+# --- ENTRY POINT HOOK ---
+# ==============================================================================
+def add_profile_argument(parser):
+    """Adds the shared --profile flag to an entry point's argument parser."""
+    parser.add_argument(
+        "--profile", nargs="?", const="cprofile", choices=PROFILE_MODES, default=os.environ.get(PROFILE_ENV) or None,
+        help=f"profile the run with cProfile (default) or pyinstrument; also settable via {PROFILE_ENV}",
+    )
+    return parser
+
+def add_dry_run_arguments(parser):
+    """Adds --dry-run and --rate to a shipping entry point's argument parser."""
+    parser.add_argument("--dry-run", action="store_true",
+                        help="validate and serialize every request and project the run without creating shipments")
+    parser.add_argument("--rate", action="store_true",
+                        help="with --dry-run, quote each order with rateShipment to estimate the cost")
+    return parser
+
+def parse_entry_point_args(description, argv=None, dry_run=False):
+    """Argument parser for entry points that only take the shared flags (plus the dry-run ones with `dry_run`)."""
+    parser = argparse.ArgumentParser(description=description)
+    add_profile_argument(parser)
+    if dry_run:
+        add_dry_run_arguments(parser)
+    return parser.parse_args(argv)
+
+@contextmanager
+def profiled(name, mode=None, output_dir=PROFILES_DIR):
+    """
+    Profiles the enclosed block when `mode` is "cprofile" or "pyinstrument".
+
+    cProfile output is written as a .prof file (open with snakeviz or pstats) and
+    the top functions by cumulative time are printed. pyinstrument writes an
+    HTML flame report. With no mode this is a no-op.
+    """
+    if not mode:
+        yield
+        return
+    os.makedirs(output_dir, exist_ok=True)
+    stem = os.path.join(output_dir, f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    if mode == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("WARNING: pyinstrument is not installed; falling back to cProfile.")
+            mode = "cprofile"
+        else:
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                with open(f"{stem}.html", "w") as f:
+                    f.write(profiler.output_html())
+                print(f"Profile saved to: {stem}.html")
+            return
+
+    import cProfile
+    import pstats
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(f"{stem}.prof")
+        print(f"\nProfile saved to: {stem}.prof")
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(PROFILE_TOP_N)
+
+# ==============================================================================
+# --- STAGE TIMINGS ---
+# ==============================================================================
+class StageTimings:
+    """Collects wall-clock samples per named stage and summarizes them as JSON-friendly dicts."""
+
+    def __init__(self):
+        self.samples = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        self.samples.setdefault(name, []).append(seconds)
+
+    def summary(self):
+        result = {}
+        for name, samples in self.samples.items():
+            ordered = sorted(samples)
+            result[name] = {
+                "count": len(ordered),
+                "total_s": round(sum(ordered), 6),
+                "mean_ms": round(sum(ordered) / len(ordered) * 1000, 3),
+                "p50_ms": round(_percentile(ordered, 0.50) * 1000, 3),
+                "p95_ms": round(_percentile(ordered, 0.95) * 1000, 3),
+                "max_ms": round(ordered[-1] * 1000, 3),
+            }
+        return result
+
+def _percentile(ordered, fraction):
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
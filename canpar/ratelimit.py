@@ -0,0 +1,199 @@
+import time
+import threading
+from collections import deque
+
+# ==============================================================================
+# --- CONFIGURATION ---
+# ==============================================================================
+# AIMD tuning. The concurrency limit grows by one per window of healthy calls
+# and halves on a congestion signal: a SOAP fault, a transport error, or a call
+# slower than LATENCY_SPIKE_FACTOR x the running baseline latency of the same
+# operation (a getLabels call carrying a PDF is not compared with a
+# trackByBarcode call). Once the limit is down to one call, further faults
+# pause the account instead.
+DECREASE_FACTOR = 0.5
+PROBE_FACTOR = 0.1            # growth rate past the limit where congestion last hit
+LATENCY_SPIKE_FACTOR = 3.0
+BASELINE_ALPHA = 0.1          # weight of a new healthy sample in the baseline latency
+SPIKE_BASELINE_ALPHA = 0.05   # weight of a spike, so a lasting latency shift becomes the new baseline
+MIN_BASELINE_SAMPLES = 5      # no latency verdicts until the baseline has settled
+BASE_BACKOFF_S = 0.5          # pause after a fault at concurrency 1, doubled per consecutive fault
+MAX_BACKOFF_S = 30.0
+RECENT_CALLS = 50             # completions used for the "settled" rate
+
+# ==============================================================================
+# --- TOKEN BUCKET ---
+# ==============================================================================
+class TokenBucket:
+    """
+    Allows `rate` calls per second on average and bursts of up to `burst` calls.
+
+    A rate of 0 disables the bucket.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+# ==============================================================================
+# --- ADAPTIVE CONCURRENCY ---
+# ==============================================================================
+class AdaptiveLimiter:
+    """
+    Token bucket plus an AIMD concurrency limit for one account.
+
+    `acquire()` blocks until a call may start and returns its start time;
+    `release(started, fault, operation)` reports how it went. With `adaptive` off the
+    limit stays at `max_concurrency`, faults never pause, and only the bucket applies.
+    """
+
+    def __init__(self, max_concurrency, max_calls_per_second=0.0, burst=1, adaptive=True):
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.adaptive = adaptive
+        self.bucket = TokenBucket(max_calls_per_second, burst)
+        self.limit = 1.0 if adaptive else float(self.max_concurrency)
+        self.lowest_limit = self.limit
+        self.ceiling = None
+        self.in_flight = 0
+        self.baselines = {}  # operation -> [baseline latency, samples]
+        self.last_decrease = 0.0
+        self.consecutive_faults = 0
+        self.paused_until = 0.0
+        self.stats = {"calls": 0, "faults": 0, "latency_spikes": 0, "decreases": 0, "pauses": 0}
+        self.first_start = None
+        self.recent = deque(maxlen=RECENT_CALLS)
+        self.latencies = []
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    self.condition.wait(self.paused_until - now)
+                elif self.in_flight >= int(self.limit):
+                    self.condition.wait()
+                else:
+                    break
+            self.in_flight += 1
+        self.bucket.acquire()
+        started = time.monotonic()
+        with self.condition:
+            if self.first_start is None:
+                self.first_start = started
+        return started
+
+    def release(self, started, fault=False, operation=None):
+        now = time.monotonic()
+        latency = now - started
+        with self.condition:
+            self.in_flight -= 1
+            self.stats["calls"] += 1
+            self.recent.append(now)
+            self.latencies.append(latency)
+            baseline = self.baselines.setdefault(operation, [None, 0])
+            spike = (not fault and baseline[1] >= MIN_BASELINE_SAMPLES
+                     and latency > baseline[0] * LATENCY_SPIKE_FACTOR)
+            if fault:
+                self.stats["faults"] += 1
+                self.consecutive_faults += 1
+            else:
+                self.consecutive_faults = 0
+            if spike:
+                self.stats["latency_spikes"] += 1
+            if not fault:
+                alpha = SPIKE_BASELINE_ALPHA if spike else BASELINE_ALPHA
+                baseline[0] = latency if baseline[0] is None else (1 - alpha) * baseline[0] + alpha * latency
+                baseline[1] += 1
+            if self.adaptive:
+                if fault and self.limit < 2:
+                    backoff = min(MAX_BACKOFF_S, BASE_BACKOFF_S * 2 ** (self.consecutive_faults - 1))
+                    self.paused_until = max(self.paused_until, now + backoff)
+                    self.stats["pauses"] += 1
+                if fault or spike:
+                    # Calls that started before the last decrease were already in
+                    # flight at the old limit; they don't count as a new signal.
+                    if started >= self.last_decrease:
+                        self.ceiling = int(self.limit)
+                        self.limit = max(1.0, self.limit * DECREASE_FACTOR)
+                        self.lowest_limit = min(self.lowest_limit, self.limit)
+                        self.last_decrease = now
+                        self.stats["decreases"] += 1
+                else:
+                    step = 1.0 / self.limit
+                    if self.ceiling and self.limit >= self.ceiling - 1:
+                        step *= PROBE_FACTOR
+                    self.limit = min(self.max_concurrency, self.limit + step)
+            self.condition.notify_all()
+
+    def effective_rate(self):
+        """Calls per second over the most recent completions (the rate the limiter settled on)."""
+        with self.condition:
+            if len(self.recent) < 2 or self.recent[-1] <= self.recent[0]:
+                return 0.0
+            return (len(self.recent) - 1) / (self.recent[-1] - self.recent[0])
+
+    def report(self, name):
+        if not self.stats["calls"]:
+            return
+        latencies = sorted(self.latencies)
+        p50 = latencies[len(latencies) // 2] * 1000
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+        elapsed = (self.recent[-1] - self.first_start) if self.first_start is not None else 0.0
+        overall = self.stats["calls"] / elapsed if elapsed > 0 else 0.0
+        settled = f"{self.effective_rate():.1f} calls/s" if len(self.recent) > 1 else "-"
+        print(f"INFO: Account '{name}' rate control: {self.stats['calls']} calls, {overall:.1f} calls/s overall, "
+              f"settled at {settled} with concurrency {int(self.limit)}/{self.max_concurrency} "
+              f"(lowest {int(self.lowest_limit)}); {self.stats['faults']} faults, "
+              f"{self.stats['latency_spikes']} latency spikes, {self.stats['decreases']} backoffs, "
+              f"{self.stats['pauses']} pauses; "
+              f"latency p50 {p50:.0f} ms, p95 {p95:.0f} ms.")
+
+class LimiterPlugin:
+    """
+    Zeep plugin that runs every SOAP call of one client through an `AdaptiveLimiter`.
+
+    The slot is taken in egress and given back in ingress, where a Fault body
+    counts as congestion. A call that never reaches ingress (timeout, connection
+    error) is released as a fault by the next egress or by `abandon()`.
+    """
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+        self.started = None
+        self.operation = None
+
+    def ingress(self, envelope, http_headers, operation):
+        if self.started is not None:
+            fault = envelope is not None and envelope.find("{*}Body/{*}Fault") is not None
+            self.limiter.release(self.started, fault=fault, operation=self.operation)
+            self.started = None
+        return envelope, http_headers
+
+    def egress(self, envelope, http_headers, operation, binding_options):
+        self.abandon()
+        self.operation = operation.name
+        self.started = self.limiter.acquire()
+        return envelope, http_headers
+
+    def abandon(self):
+        if self.started is not None:
+            self.limiter.release(self.started, fault=True, operation=self.operation)
+            self.started = None
@@ -0,0 +1,154 @@
+import os
+import csv
+import threading
+
+from canpar.config import get_config
+
+# ==============================================================================
+# --- SUMMARY SCHEMA ---
+# ==============================================================================
+# One row per processed order. Identifiers stay strings end to end so order and
+# tracking numbers never turn into floats or lose leading zeros.
+SUMMARY_SCHEMA = [
+    ("Order number", "string"),
+    ("Customer Name", "string"),
+    ("SKU", "string"),
+    ("Quantity", "int64"),
+    ("Account", "string"),
+    ("Tracking Number", "string"),
+    ("Shipment API Status", "string"),
+    ("Label API Status", "string"),
+    ("Error Details", "string"),
+    ("Timestamp", "string"),
+]
+SUMMARY_COLUMNS = [name for name, _ in SUMMARY_SCHEMA]
+FORMAT_EXTENSIONS = {"parquet": ".parquet", "csv": ".csv"}
+PARQUET_ROW_GROUP_SIZE = 1000
+
+def resolve_format(fmt):
+    """
+    Turns "auto" into "csv".
+
+    The summary is streamed while labels are being bought, so the default is the
+    format that survives a crash. A Parquet file only gets its footer on a clean
+    close; until then it cannot be read.
+    """
+    return "csv" if fmt == "auto" else fmt
+
+# ==============================================================================
+# --- STREAMING SINK ---
+# ==============================================================================
+class ResultsSink:
+    """
+    Streams summary rows to disk as orders finish, from any number of worker threads.
+
+    CSV rows are flushed one by one, so a crash keeps everything written so far.
+    Parquet rows are buffered into row groups of PARQUET_ROW_GROUP_SIZE, and the
+    file is only readable once `close()` has written its footer. The
+    optional xlsx copy uses openpyxl's write-only mode, so memory stays constant
+    however many rows are written.
+    """
+
+    def __init__(self, stem, fmt="auto", xlsx=False):
+        self.format = resolve_format(fmt)
+        if self.format not in FORMAT_EXTENSIONS:
+            raise ValueError(f"Unsupported summary format: {fmt}")
+        self.path = stem + FORMAT_EXTENSIONS[self.format]
+        self.xlsx_path = stem + ".xlsx" if xlsx else None
+        self.lock = threading.Lock()
+        self.rows_written = 0
+        self.pending = []
+        self._open()
+
+    def _open(self):
+        if self.format == "csv":
+            self.file = open(self.path, "w", newline="", encoding="utf-8")
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(SUMMARY_COLUMNS)
+            self.file.flush()
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            self.schema = pa.schema([(name, pa.int64() if kind == "int64" else pa.string()) for name, kind in SUMMARY_SCHEMA])
+            self.writer = pq.ParquetWriter(self.path, self.schema)
+        if self.xlsx_path:
+            from openpyxl import Workbook
+            self.workbook = Workbook(write_only=True)
+            self.sheet = self.workbook.create_sheet()
+            self.sheet.append(SUMMARY_COLUMNS)
+
+    def write(self, record):
+        row = [_coerce(record.get(name), kind) for name, kind in SUMMARY_SCHEMA]
+        with self.lock:
+            if self.format == "csv":
+                self.writer.writerow(row)
+                self.file.flush()
+            else:
+                self.pending.append(row)
+                if len(self.pending) >= PARQUET_ROW_GROUP_SIZE:
+                    self._flush_parquet()
+            if self.xlsx_path:
+                self.sheet.append(row)
+            self.rows_written += 1
+
+    def _flush_parquet(self):
+        if not self.pending:
+            return
+        import pyarrow as pa
+        columns = list(zip(*self.pending))
+        self.writer.write_table(pa.table(
+            [pa.array(values, type=self.schema.field(i).type) for i, values in enumerate(columns)], schema=self.schema
+        ))
+        self.pending = []
+
+    def close(self):
+        with self.lock:
+            if self.format == "csv":
+                self.file.close()
+            else:
+                self._flush_parquet()
+                self.writer.close()
+            if self.xlsx_path:
+                self.workbook.save(self.xlsx_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def _coerce(value, kind):
+    if value is None or value != value:  # None or NaN
+        return None if kind == "int64" else ""
+    if kind == "int64":
+        return int(float(value))
+    return str(value)
+
+def open_results_sink(stem):
+    """Opens a sink using the [summary] settings from the shared config."""
+    config = get_config()
+    return ResultsSink(stem, config.summary.format, config.summary.xlsx)
+
+# ==============================================================================
+# --- READING ---
+# ==============================================================================
+def find_results(stem):
+    """Returns the newest summary written for `stem`, preferring the typed formats over xlsx."""
+    candidates = [stem + ext for ext in (".parquet", ".csv", ".xlsx") if os.path.exists(stem + ext)]
+    if not candidates:
+        return None
+    fast = [path for path in candidates if not path.endswith(".xlsx")]
+    return max(fast or candidates, key=os.path.getmtime)
+
+def read_results(path):
+    """Loads a summary file into a DataFrame with the schema's dtypes."""
+    import pandas as pd
+    dtypes = {name: ("Int64" if kind == "int64" else "string") for name, kind in SUMMARY_SCHEMA}
+    if path.endswith(".parquet"):
+        df = pd.read_parquet(path)
+    elif path.endswith(".csv"):
+        df = pd.read_csv(path, dtype=str, keep_default_na=False, encoding="utf-8")
+        df["Quantity"] = pd.to_numeric(df["Quantity"], errors="coerce")
+    else:
+        df = pd.read_excel(path, dtype={"Order number": str, "Tracking Number": str})
+    return df.astype({name: dtype for name, dtype in dtypes.items() if name in df.columns})
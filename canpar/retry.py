@@ -0,0 +1,129 @@
+import os
+import time
+from datetime import datetime, timedelta
+
+from canpar.accounts import run_sharded
+from canpar.audit import get_audit_log, audited_fields
+from canpar.config import get_config, get_accounts, ConfigError
+from canpar.client import client_factory
+from canpar.labels import get_canpar_label
+from canpar.shipment_log import (LOG_FILE_NAME, load_pending_index, merge_log_entries, rebuild_pending_index,
+                                 setup_log_directories)
+
+# ==============================================================================
+# --- CONFIGURATION ---
+# ==============================================================================
+# Labels are retried from the pending-label index next to the shipment log (see
+# canpar/shipment_log.py), never by scanning the log. Each failed retry waits
+# [retry] backoff_seconds, doubled per attempt, before the next one; after
+# max_attempts the order is marked as given up.
+MAX_WATCH_SLEEP_S = 15 * 60  # wake up at least this often in --watch mode to pick up new failures
+
+# ==============================================================================
+# --- SCHEDULING ---
+# ==============================================================================
+def retry_delay(attempts, settings):
+    """Seconds to wait after the `attempts`-th failed retry."""
+    return min(settings.max_backoff_minutes * 60, settings.backoff_seconds * 2 ** (attempts - 1))
+
+def due_retries(pending, now):
+    """Pending labels whose backoff has elapsed, as work items for `run_sharded`."""
+    return [dict(info, order_id=order_id) for order_id, info in pending.items()
+            if not info.get('next_retry_at') or info['next_retry_at'] <= now.isoformat()]
+
+def next_retry_at(pending):
+    times = [info['next_retry_at'] for info in pending.values() if info.get('next_retry_at')]
+    return datetime.fromisoformat(min(times)) if times else None
+
+# ==============================================================================
+# --- RETRY WORKFLOW ---
+# ==============================================================================
+def retry_pass(canpar_log_file, accounts_cfg, xml_dir, pdf_dir, failed_labels_dir):
+    """
+    Retries every due label once, in parallel across the account client pools.
+
+    All results are written to the log in a single update at the end of the
+    pass. Returns the pending-label index after the pass.
+    """
+    pending = load_pending_index(canpar_log_file)
+    due = due_retries(pending, datetime.now())
+    if not due:
+        return pending
+
+    print(f"INFO: Retrying {len(due)} of {len(pending)} pending labels.")
+    settings = get_config().retry
+    audit = get_audit_log()
+
+    def retry_label(account, client, capture, item):
+        order_id = item['order_id']
+        attempt = item.get('attempts', 0) + 1
+        print(f"\n--- Retrying Order: {order_id} (attempt {attempt}/{settings.max_attempts}) ---")
+
+        with audit.stage(order_id, "label_retry", source="retry", account=account['name'],
+                         tracking_number=item.get('tracking_number'), attempt=attempt) as event:
+            retry_result = get_canpar_label(client, capture, item['shipment_id'], order_id, account, pdf_dir, xml_dir,
+                                            failed_labels_dir, request_type="get_label_retry")
+            event.update(audited_fields(retry_result, "status", "error", "label_path", "xml_path", "failed_path"))
+
+            fields = {"label_retrieval": retry_result, "last_retry_timestamp": datetime.now().isoformat(),
+                      "label_retry_attempts": attempt}
+            if retry_result['status'] != 'SUCCESS':
+                if attempt >= settings.max_attempts:
+                    fields['label_retry_gave_up'] = True
+                    event.update(gave_up=True)
+                else:
+                    retry_at = datetime.now() + timedelta(seconds=retry_delay(attempt, settings))
+                    fields['next_label_retry_at'] = retry_at.isoformat()
+        return order_id, fields
+
+    results = run_sharded(due, accounts_cfg, None, client_factory, retry_label,
+                          batch_size=get_config().runtime.batch_size,
+                          priority=lambda item: item.get('next_retry_at') or "",
+                          account_of=lambda item: item.get('account'))
+    updates = dict(results)
+    written = merge_log_entries(canpar_log_file, updates)
+    if written < len(updates):
+        print(f"WARNING: {len(updates) - written} retried orders were not found in {canpar_log_file}.")
+
+    retrieved = sum(1 for fields in updates.values() if fields['label_retrieval']['status'] == 'SUCCESS')
+    gave_up = sum(1 for fields in updates.values() if fields.get('label_retry_gave_up'))
+    print(f"INFO: Retry pass finished: {retrieved} labels retrieved, {len(updates) - retrieved - gave_up} to retry later, "
+          f"{gave_up} given up after {settings.max_attempts} attempts. Log updated once: {canpar_log_file}")
+    return load_pending_index(canpar_log_file)
+
+def run_retry_process(logs_dir, watch=False, rebuild_index=False):
+    """Retries failed labels once, or with `watch` until none is left (retrieved or given up)."""
+    print("\n--- Starting Canpar Label Retry Script ---")
+
+    canpar_logs_dir, xml_dir, pdf_dir, failed_labels_dir = setup_log_directories(logs_dir)
+    canpar_log_file = os.path.join(canpar_logs_dir, LOG_FILE_NAME)
+
+    if not os.path.exists(canpar_log_file):
+        print(f"INFO: Log file not found at {canpar_log_file}. Nothing to retry.")
+        return
+
+    try:
+        accounts_cfg = get_accounts()
+    except ConfigError as e:
+        print(f"FATAL: {e}")
+        return
+
+    if rebuild_index:
+        print(f"INFO: Rebuilt the pending-label index: {len(rebuild_pending_index(canpar_log_file))} labels pending.")
+
+    while True:
+        try:
+            pending = retry_pass(canpar_log_file, accounts_cfg, xml_dir, pdf_dir, failed_labels_dir)
+        except RuntimeError as e:
+            print(f"FATAL: {e}")
+            return
+        if not pending:
+            print("INFO: No failed labels to retry.")
+            return
+        retry_at = next_retry_at(pending)
+        print(f"INFO: {len(pending)} labels pending, next retry due at "
+              f"{retry_at:%Y-%m-%d %H:%M:%S}." if retry_at else f"INFO: {len(pending)} labels pending.")
+        if not watch:
+            return
+        sleep_s = MAX_WATCH_SLEEP_S if retry_at is None else (retry_at - datetime.now()).total_seconds()
+        time.sleep(min(MAX_WATCH_SLEEP_S, max(1.0, sleep_s)))
@@ -0,0 +1,132 @@
+import math
+import threading
+from datetime import datetime, timedelta
+
+# ==============================================================================
+# --- CONFIGURATION ---
+# ==============================================================================
+# Orders are shipped earliest deadline first. The deadline is Best Buy's
+# shipping deadline, falling back to the latest estimated delivery date; orders
+# with neither go last, in file order.
+CSV_DEADLINE_COLUMNS = ("Shipping deadline", "Latest estimated delivery date")
+DEADLINE_FORMATS = ("%m/%d/%Y %I:%M:%S %p", "%m/%d/%Y %H:%M:%S", "%m/%d/%Y", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d")
+DUE_SOON = timedelta(hours=24)
+NO_DEADLINE = datetime.max
+
+# ==============================================================================
+# --- DEADLINES ---
+# ==============================================================================
+def parse_deadline(value):
+    """
+    Parses a deadline from the CSV export ("10/06/2025 11:59:59 p.m.") or the API (ISO 8601).
+
+    Returns a naive local datetime, or None when the value is missing or unreadable.
+    """
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        text = str(value).strip()
+        if not text:
+            return None
+        parsed = None
+        try:
+            parsed = datetime.fromisoformat(text.replace("Z", "+00:00"))
+        except ValueError:
+            text = text.replace("a.m.", "AM").replace("p.m.", "PM")
+            for fmt in DEADLINE_FORMATS:
+                try:
+                    parsed = datetime.strptime(text, fmt)
+                    break
+                except ValueError:
+                    continue
+        if parsed is None:
+            return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+def csv_deadline(order):
+    """Deadline of a Best Buy CSV export row."""
+    for column in CSV_DEADLINE_COLUMNS:
+        deadline = parse_deadline(order.get(column))
+        if deadline:
+            return deadline
+    return None
+
+def api_deadline(order):
+    """Deadline of a Best Buy API order."""
+    return parse_deadline(order.get("shipping_deadline")) or \
+        parse_deadline((order.get("delivery_date") or {}).get("latest"))
+
+def deadline_priority(deadline_of):
+    """Builds a `run_sharded` priority key: earliest deadline first, orders without one last."""
+    def priority(order):
+        return deadline_of(order) or NO_DEADLINE
+    return priority
+
+# ==============================================================================
+# --- SLA REPORT ---
+# ==============================================================================
+class SlaReport:
+    """
+    Counts orders labeled before their deadline.
+
+    `plan()` prints how urgent the batch is before it starts; `record()` is
+    called from worker threads as each order finishes.
+    """
+
+    def __init__(self, now=None):
+        self.started = now or datetime.now()
+        self.lock = threading.Lock()
+        self.on_time = 0
+        self.late = []
+        self.failed = 0
+        self.failed_overdue = 0
+        self.no_deadline = 0
+
+    def plan(self, orders, deadline_of, scheduled):
+        deadlines = [deadline_of(order) for order in orders]
+        overdue = sum(1 for d in deadlines if d and d < self.started)
+        due_soon = sum(1 for d in deadlines if d and self.started <= d < self.started + DUE_SOON)
+        missing = sum(1 for d in deadlines if not d)
+        order_desc = "earliest deadline first" if scheduled else "in file order"
+        print(f"INFO: Shipping {len(orders)} orders {order_desc}: {overdue} already past their deadline, "
+              f"{due_soon} due within {DUE_SOON.total_seconds() / 3600:.0f}h, {missing} without a deadline.")
+
+    def record(self, order_id, deadline, labeled, labeled_at=None):
+        """Counts one finished order. Returns True/False for on time/late, or None if unknown."""
+        labeled_at = labeled_at or datetime.now()
+        with self.lock:
+            if not deadline:
+                self.no_deadline += 1
+                return None
+            if not labeled:
+                self.failed += 1
+                self.failed_overdue += labeled_at > deadline
+                return False
+            if labeled_at <= deadline:
+                self.on_time += 1
+                return True
+            self.late.append((labeled_at - deadline, order_id))
+            return False
+
+    def print_report(self):
+        with self.lock:
+            with_deadline = self.on_time + len(self.late) + self.failed
+            if not with_deadline:
+                return
+            line = (f"SLA: {self.on_time}/{with_deadline} orders labeled before their deadline "
+                    f"({self.on_time / with_deadline:.1%}); {len(self.late)} labeled late, {self.failed} not labeled")
+            if self.failed:
+                line += f" ({self.failed_overdue} of them now overdue)"
+            if self.no_deadline:
+                line += f"; {self.no_deadline} without a deadline"
+            print(line + ".")
+            for lateness, order_id in sorted(self.late, reverse=True)[:10]:
+                print(f"   Late: order {order_id} labeled {_format_delay(lateness)} after its deadline")
+
+def _format_delay(delta):
+    hours = delta.total_seconds() / 3600
+    return f"{hours / 24:.1f} days" if hours >= 48 else f"{hours:.1f} h"
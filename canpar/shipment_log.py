@@ -0,0 +1,150 @@
+import os
+import json
+import threading
+
+# The shipment log (canpar_shipments_log.json) holds one entry per order, keyed
+# by "order_id". Writers in the same process share LOG_FILE_LOCK.
+#
+# Next to it, canpar_pending_labels.json indexes the orders whose shipment was
+# created but whose label is still missing, so the retry script never has to
+# scan the whole log. The index is derived from the log: every write below keeps
+# it in sync, and it is rebuilt from the log if it is missing.
+LOG_FILE_NAME = "canpar_shipments_log.json"
+PENDING_INDEX_NAME = "canpar_pending_labels.json"
+LOG_FILE_LOCK = threading.Lock()
+
+# ==============================================================================
+# --- DIRECTORIES ---
+# ==============================================================================
+def setup_log_directories(logs_dir):
+    """
+    Creates the Canpar log and output directories under `logs_dir`.
+
+    Returns (canpar_logs_dir, xml_responses_dir, pdf_labels_dir, failed_labels_dir).
+    """
+    canpar_logs_dir = os.path.join(logs_dir, 'canpar')
+    xml_responses_dir = os.path.join(canpar_logs_dir, 'xml_responses')
+    pdf_labels_dir = os.path.join(canpar_logs_dir, 'labels')
+    failed_labels_dir = os.path.join(canpar_logs_dir, 'failed_labels')
+
+    for path in [canpar_logs_dir, xml_responses_dir, pdf_labels_dir, failed_labels_dir]:
+        os.makedirs(path, exist_ok=True)
+
+    return canpar_logs_dir, xml_responses_dir, pdf_labels_dir, failed_labels_dir
+
+# ==============================================================================
+# --- SHIPMENT LOG ---
+# ==============================================================================
+
+def load_log(log_file):
+    """Returns the log entries, or [] if the file is missing or unreadable."""
+    if not os.path.exists(log_file):
+        return []
+    with open(log_file, 'r') as f:
+        try:
+            return json.load(f)
+        except json.JSONDecodeError:
+            return []
+
+def update_log_file(log_file, new_entry):
+    """Replaces the entry for `new_entry["order_id"]` (in place) or appends it, then rewrites the log."""
+    with LOG_FILE_LOCK:
+        log_data = load_log(log_file)
+        for i, entry in enumerate(log_data):
+            if entry['order_id'] == new_entry['order_id']:
+                log_data[i] = new_entry
+                break
+        else:
+            log_data.append(new_entry)
+        _write_json(log_file, log_data)
+        _sync_pending_index(log_file, log_data, [new_entry])
+
+def merge_log_entries(log_file, updates):
+    """
+    Merges `updates` (order_id -> fields) into the existing entries with one rewrite of the log.
+
+    Order ids that are not in the log are ignored. Returns the number of entries updated.
+    """
+    with LOG_FILE_LOCK:
+        log_data = load_log(log_file)
+        changed = []
+        for entry in log_data:
+            fields = updates.get(entry['order_id'])
+            if fields:
+                entry.update(fields)
+                changed.append(entry)
+        if changed:
+            _write_json(log_file, log_data)
+            _sync_pending_index(log_file, log_data, changed)
+        return len(changed)
+
+def _write_json(path, data):
+    # Write-then-rename, so a crash mid-write never leaves a truncated log behind.
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=4)
+    os.replace(tmp_path, path)
+
+# ==============================================================================
+# --- PENDING-LABEL INDEX ---
+# ==============================================================================
+def needs_label(entry):
+    """True if the shipment exists but its label was never retrieved and retries haven't given up."""
+    return entry.get('shipment_creation', {}).get('status') == 'SUCCESS' and \
+        entry.get('label_retrieval', {}).get('status') != 'SUCCESS' and not entry.get('label_retry_gave_up')
+
+def pending_index_path(log_file):
+    return os.path.join(os.path.dirname(log_file), PENDING_INDEX_NAME)
+
+def load_pending_index(log_file):
+    """Returns order_id -> retry info for every order still missing its label."""
+    index = _read_index(pending_index_path(log_file))
+    if index is None:
+        with LOG_FILE_LOCK:
+            index = _build_index(load_log(log_file))
+            _write_json(pending_index_path(log_file), index)
+    return index
+
+def rebuild_pending_index(log_file):
+    """Rebuilds the index from a full scan of the log. Returns it."""
+    with LOG_FILE_LOCK:
+        if os.path.exists(pending_index_path(log_file)):
+            os.remove(pending_index_path(log_file))
+    return load_pending_index(log_file)
+
+def _read_index(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        try:
+            return json.load(f)
+        except json.JSONDecodeError:
+            return None
+
+def _build_index(log_data):
+    return {entry['order_id']: _pending_info(entry) for entry in log_data if needs_label(entry)}
+
+def _pending_info(entry):
+    creation = entry['shipment_creation']
+    return {
+        "shipment_id": creation.get('shipment_id'), "tracking_number": creation.get('tracking_number'),
+        "account": entry.get('account'), "attempts": entry.get('label_retry_attempts', 0),
+        "next_retry_at": entry.get('next_label_retry_at'),
+        "last_status": entry.get('label_retrieval', {}).get('status'),
+    }
+
+def _sync_pending_index(log_file, log_data, entries):
+    """Updates the index for `entries`; rewrites it only if something changed (or it had to be rebuilt)."""
+    path = pending_index_path(log_file)
+    index = _read_index(path)
+    if index is None:
+        _write_json(path, _build_index(log_data))
+        return
+    before = dict(index)
+    for entry in entries:
+        if needs_label(entry):
+            index[entry['order_id']] = _pending_info(entry)
+        else:
+            index.pop(entry['order_id'], None)
+    if index != before:
+        _write_json(path, index)
@@ -0,0 +1,273 @@
+import os
+import sqlite3
+import functools
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from canpar import REPO_ROOT
+from canpar.accounts import ClientPool
+from canpar.audit import get_audit_log
+from canpar.config import get_config
+from canpar.shipment_log import LOG_FILE_NAME, load_log
+
+# ==============================================================================
+# --- CONFIGURATION ---
+# ==============================================================================
+SHIPMENT_LOG_FILE = os.path.join(REPO_ROOT, "jules_bb_python", "logs", "canpar", LOG_FILE_NAME)
+DELIVERED_CODES = {"DEL"}
+EVENT_TIME_FORMATS = ("%Y%m%d %H%M%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S")
+
+# A shipment is "open" until it is delivered or polling gives up on it ("expired").
+# Only open shipments that are due (next_check_at <= now) are ever queried.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS shipments (
+    barcode TEXT PRIMARY KEY,
+    order_id TEXT,
+    shipment_id TEXT,
+    account TEXT,
+    created_at TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'open',
+    last_code TEXT,
+    last_description TEXT,
+    last_event_at TEXT,
+    last_change_at TEXT,
+    last_checked_at TEXT,
+    next_check_at TEXT,
+    interval_s REAL,
+    checks INTEGER NOT NULL DEFAULT 0,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS shipments_due ON shipments (state, next_check_at);
+CREATE TABLE IF NOT EXISTS events (
+    barcode TEXT NOT NULL,
+    event_at TEXT NOT NULL,
+    code TEXT NOT NULL,
+    description TEXT,
+    location TEXT,
+    recorded_at TEXT NOT NULL,
+    PRIMARY KEY (barcode, event_at, code)
+);
+"""
+
+# ==============================================================================
+# --- STATUS STORE ---
+# ==============================================================================
+class TrackingStore:
+    """
+    SQLite-backed list of shipments to track and the scans seen for each.
+
+    Scans are only ever inserted, never rewritten, so a refresh costs one row
+    per new scan plus one update per polled shipment.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def add_shipments(self, shipments, now):
+        """Registers new barcodes, due immediately. Barcodes already tracked are left alone."""
+        with self.connection:
+            before = self.connection.total_changes
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO shipments (barcode, order_id, shipment_id, account, created_at, last_change_at, next_check_at) "
+                "VALUES (:barcode, :order_id, :shipment_id, :account, :created_at, :created_at, :now)",
+                [dict(shipment, now=now.isoformat()) for shipment in shipments],
+            )
+            return self.connection.total_changes - before
+
+    def due(self, now, limit=None):
+        query = "SELECT * FROM shipments WHERE state = 'open' AND next_check_at <= ? ORDER BY next_check_at"
+        params = [now.isoformat()]
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        return [dict(row) for row in self.connection.execute(query, params)]
+
+    def next_due_at(self):
+        row = self.connection.execute("SELECT MIN(next_check_at) FROM shipments WHERE state = 'open'").fetchone()
+        return datetime.fromisoformat(row[0]) if row[0] else None
+
+    def record_events(self, barcode, events, now):
+        """Stores scans not seen before and returns how many were new."""
+        before = self.connection.total_changes
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO events (barcode, event_at, code, description, location, recorded_at) VALUES (?, ?, ?, ?, ?, ?)",
+            [(barcode, e["event_at"], e["code"], e["description"], e["location"], now.isoformat()) for e in events],
+        )
+        return self.connection.total_changes - before
+
+    def update_shipment(self, barcode, **fields):
+        assignments = ", ".join(f"{name} = :{name}" for name in fields)
+        self.connection.execute(f"UPDATE shipments SET {assignments}, checks = checks + 1 WHERE barcode = :barcode",
+                                dict(fields, barcode=barcode))
+
+    def history(self, barcode):
+        return [dict(row) for row in self.connection.execute(
+            "SELECT event_at, code, description, location FROM events WHERE barcode = ? ORDER BY event_at", (barcode,))]
+
+    def counts(self):
+        return dict(self.connection.execute("SELECT state, COUNT(*) FROM shipments GROUP BY state").fetchall())
+
+@functools.lru_cache(maxsize=None)
+def get_tracking_db_path():
+    path = get_config().tracking.db_path
+    return path if os.path.isabs(path) else os.path.join(REPO_ROOT, path)
+
+# ==============================================================================
+# --- SHIPMENT SOURCES ---
+# ==============================================================================
+def shipments_from_log(log_file=SHIPMENT_LOG_FILE):
+    """Successful shipments from the monolithic script's canpar_shipments_log.json."""
+    shipments = []
+    for entry in load_log(log_file):
+        creation = entry.get('shipment_creation', {})
+        if creation.get('status') == 'SUCCESS' and creation.get('tracking_number'):
+            shipments.append({
+                "barcode": str(creation['tracking_number']), "order_id": str(entry['order_id']),
+                "shipment_id": str(creation.get('shipment_id') or ""), "account": entry.get('account'),
+                "created_at": entry.get('timestamp') or datetime.now().isoformat(),
+            })
+    return shipments
+
+def shipments_from_summary(stem):
+    """Successful shipments from the Canpar_Shipment_Summary written by 0. BB_to_Canpar.py."""
+    from canpar.results import find_results, read_results
+    path = find_results(stem)
+    if not path:
+        return []
+    df = read_results(path)
+    ok = df[(df["Shipment API Status"] == "SUCCESS") & (df["Tracking Number"] != "N/A")]
+    return [{
+        "barcode": str(row["Tracking Number"]), "order_id": str(row["Order number"]), "shipment_id": "",
+        "account": row.get("Account") if "Account" in df.columns else None,
+        "created_at": _parse_time(row["Timestamp"]).isoformat() if _parse_time(row["Timestamp"]) else datetime.now().isoformat(),
+    } for _, row in ok.iterrows()]
+
+# ==============================================================================
+# --- CANPAR TRACKING CALLS ---
+# ==============================================================================
+def tracking_client_factory(plugins):
+    """Client factory for ClientPool: a zeep client for Canpar's add-ons (tracking) service."""
+    from canpar.client import create_client
+    return create_client(get_config().tracking.wsdl_url, plugins)
+
+def fetch_events(client, barcode):
+    """Returns every scan Canpar has for `barcode` as plain dicts, oldest first."""
+    response = client.service.trackByBarcode(request={"barcode": barcode, "track_shipment": False})
+    if response is None:
+        raise RuntimeError("Empty tracking response")
+    if response.error:
+        raise RuntimeError(str(response.error))
+    events = []
+    for result in response.result or []:
+        for event in result.events or []:
+            address = getattr(event, "address", None)
+            location = ", ".join(filter(None, [getattr(address, "city", None), getattr(address, "province", None)]))
+            event_time = _parse_time(event.local_date_time)
+            events.append({
+                "event_at": event_time.isoformat() if event_time else str(event.local_date_time or ""),
+                "code": (event.code or "").strip().upper(),
+                "description": (event.code_description_en or "").strip(),
+                "location": location,
+            })
+    return sorted(events, key=lambda e: e["event_at"])
+
+def is_delivered(event):
+    return event["code"] in DELIVERED_CODES or event["description"].upper().startswith("DELIVERED")
+
+def _parse_time(value):
+    for fmt in EVENT_TIME_FORMATS:
+        try:
+            return datetime.strptime(str(value).strip(), fmt)
+        except ValueError:
+            continue
+    return None
+
+# ==============================================================================
+# --- POLLING SCHEDULE ---
+# ==============================================================================
+def schedule_next(shipment, new_events, delivered, now, settings):
+    """
+    Decides what happens to a shipment after a check.
+
+    Delivered shipments are closed. Shipments with fresh scans are checked again
+    after the base interval. Once a shipment has had no new scan for
+    `stale_after_hours`, its interval doubles on every quiet check up to
+    `max_interval_hours`, and after `give_up_after_days` it is no longer polled.
+    """
+    base = settings.poll_interval_minutes * 60
+    if delivered:
+        return {"state": "delivered", "next_check_at": None, "interval_s": None}
+    if now - datetime.fromisoformat(shipment["created_at"]) > timedelta(days=settings.give_up_after_days):
+        return {"state": "expired", "next_check_at": None, "interval_s": None}
+    last_change = now if new_events else datetime.fromisoformat(shipment["last_change_at"])
+    if now - last_change > timedelta(hours=settings.stale_after_hours):
+        interval = min((shipment["interval_s"] or base) * 2, settings.max_interval_hours * 3600)
+    else:
+        interval = base
+    return {"state": "open", "next_check_at": (now + timedelta(seconds=interval)).isoformat(), "interval_s": interval}
+
+# ==============================================================================
+# --- REFRESH ---
+# ==============================================================================
+def refresh(store, now=None, limit=None, client_factory=tracking_client_factory):
+    """
+    Polls every due shipment once, with at most `tracking.max_workers` calls in flight.
+
+    Results are written to the store as each call completes and committed once
+    at the end. Returns a dict of counters for the run.
+    """
+    settings = get_config().tracking
+    now = now or datetime.now()
+    due = store.due(now, limit)
+    stats = {"checked": len(due), "new_events": 0, "delivered": 0, "expired": 0, "errors": 0}
+    if not due:
+        return stats
+
+    runtime = get_config().runtime
+    pool = ClientPool({"name": "tracking", "max_workers": settings.max_workers, "burst": runtime.burst,
+                       "max_calls_per_second": runtime.max_calls_per_second, "adaptive": runtime.adaptive}, client_factory)
+
+    def check(shipment):
+        with pool.checkout() as (client, capture):
+            try:
+                return fetch_events(client, shipment["barcode"])
+            finally:
+                capture.take()  # tracking responses aren't archived
+
+    with ThreadPoolExecutor(max_workers=pool.size, thread_name_prefix="canpar-tracking") as executor:
+        futures = {executor.submit(check, shipment): shipment for shipment in due}
+        with store.connection:
+            for future in as_completed(futures):
+                shipment = futures[future]
+                checked_at = datetime.now()
+                try:
+                    events = future.result()
+                except Exception as e:
+                    stats["errors"] += 1
+                    retry_at = checked_at + timedelta(minutes=settings.poll_interval_minutes)
+                    store.update_shipment(shipment["barcode"], last_checked_at=checked_at.isoformat(),
+                                          next_check_at=retry_at.isoformat(), error=str(e))
+                    continue
+                new_events = store.record_events(shipment["barcode"], events, checked_at)
+                delivered = any(is_delivered(event) for event in events)
+                fields = schedule_next(shipment, new_events, delivered, checked_at, settings)
+                if new_events:
+                    latest = events[-1]
+                    fields.update(last_code=latest["code"], last_description=latest["description"],
+                                  last_event_at=latest["event_at"], last_change_at=checked_at.isoformat())
+                store.update_shipment(shipment["barcode"], last_checked_at=checked_at.isoformat(), error=None, **fields)
+                if fields["state"] != "open":
+                    get_audit_log().record(shipment["order_id"], "tracking", fields["state"].upper(), source="tracking",
+                                           account=shipment["account"], tracking_number=shipment["barcode"],
+                                           last_scan=events[-1]["description"] if events else None)
+                stats["new_events"] += new_events
+                stats["delivered"] += fields["state"] == "delivered"
+                stats["expired"] += fields["state"] == "expired"
+    pool.limiter.report("tracking")
+    return stats
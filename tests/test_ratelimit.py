@@ -0,0 +1,39 @@
+from canpar import ratelimit
+from canpar.ratelimit import AdaptiveLimiter
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+def run_calls(limiter, clock, count, latency, operation="processShipment"):
+    for _ in range(count):
+        started = limiter.acquire()
+        clock.now += latency
+        limiter.release(started, operation=operation)
+
+def test_sustained_latency_shift_becomes_the_new_baseline(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ratelimit.time, "monotonic", clock.monotonic)
+    limiter = AdaptiveLimiter(max_concurrency=8)
+
+    run_calls(limiter, clock, 40, 0.010)
+    run_calls(limiter, clock, 200, 0.040)
+
+    assert limiter.stats["latency_spikes"] <= 5
+    assert limiter.baselines["processShipment"][0] > 0.035
+    assert limiter.limit >= 4
+
+def test_baselines_are_kept_per_operation(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ratelimit.time, "monotonic", clock.monotonic)
+    limiter = AdaptiveLimiter(max_concurrency=8)
+
+    for _ in range(20):
+        run_calls(limiter, clock, 1, 0.010, operation="processShipment")
+        run_calls(limiter, clock, 1, 0.100, operation="getLabels")
+
+    assert limiter.stats["latency_spikes"] == 0
+    assert limiter.stats["decreases"] == 0